@@ -0,0 +1,157 @@
+"""
+Answers many degrees-of-separation queries against one loaded graph.
+
+Reads one query per line from a file or stdin, as a source and a target
+separated by a tab. Each side may be a person's name or IMDB id. Writes
+one JSON object per query to stdout in input order, e.g.
+
+    python batch.py --directory large --workers 4 pairs.tsv > paths.jsonl
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+
+import degrees
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer source-target queries from a file or stdin."
+    )
+    parser.add_argument("pairs", nargs="?", default="-",
+                        help="tab-separated query file, or - for stdin")
+    parser.add_argument("--directory", default="large",
+                        help="directory containing the CSV data")
+    parser.add_argument("--strategy", default="bidirectional",
+                        choices=["bfs", "bidirectional", "landmark"])
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes")
+    parser.add_argument("--min-year", type=int,
+                        help="skip movies released before this year")
+    parser.add_argument("--max-year", type=int,
+                        help="skip movies released after this year")
+    parser.add_argument("--min-stars", type=int,
+                        help="skip movies with fewer stars than this")
+    args = parser.parse_args()
+
+    stats = {}
+    filters = {
+        "min_year": args.min_year,
+        "max_year": args.max_year,
+        "min_stars": args.min_stars
+    }
+    load(args.directory, args.strategy, filters, stats)
+    if stats:
+        print(f"Loaded {stats['rows']} rows in {stats['seconds']:.2f}s "
+              f"({stats['rows_per_second']:.0f} rows/s), "
+              f"peak memory {format_bytes(stats['peak_memory'])}.",
+              file=sys.stderr)
+
+    if args.pairs == "-":
+        lines = sys.stdin
+    else:
+        lines = open(args.pairs, encoding="utf-8")
+    with lines:
+        jobs = ((i, line, args.strategy) for i, line in enumerate(lines, 1)
+                if line.strip() and not line.startswith("#"))
+        if args.workers > 1:
+            with worker_pool(args.workers, args.directory,
+                             args.strategy, filters) as pool:
+                write_results(pool.imap(answer, jobs, chunksize=16))
+        else:
+            write_results(map(answer, jobs))
+
+
+def load(directory, strategy, filters, stats=None):
+    degrees.load_data(directory, stats=stats, **filters)
+    if strategy == "landmark":
+        degrees.build_landmarks()
+
+
+def format_bytes(size):
+    if size is None:
+        return "unknown"
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def worker_pool(workers, directory, strategy, filters):
+    """
+    Returns a process pool whose workers share the loaded graph.
+
+    Forked workers inherit the parent's graph copy-on-write, and the
+    snapshot arrays are a shared file mapping in any case. Where fork
+    is unavailable, each worker maps the snapshot itself on startup.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    return context.Pool(workers, initializer=init_worker,
+                        initargs=(directory, strategy, filters))
+
+
+def init_worker(directory, strategy, filters):
+    if degrees.graph is None:
+        load(directory, strategy, filters)
+
+
+def write_results(results):
+    for result in results:
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+def answer(job):
+    """
+    Resolves and answers one query line, returning its JSON result.
+    """
+    line_number, line, strategy = job
+    result = {"line": line_number}
+    fields = line.rstrip("\r\n").split("\t")
+    if len(fields) != 2:
+        result["error"] = "expected a source and a target separated by a tab"
+        return result
+
+    ids = []
+    for side, query in zip(("source", "target"), fields):
+        result[side] = query
+        person_id, error = resolve(query)
+        if error is not None:
+            result["error"] = f"{side}: {error}"
+            return result
+        ids.append(person_id)
+
+    stats = {}
+    path = degrees.shortest_path(ids[0], ids[1], strategy, stats)
+    result["source_id"], result["target_id"] = ids
+    result["degrees"] = None if path is None else len(path)
+    result["path"] = path
+    result["expanded"] = stats["source_expanded"] + stats["target_expanded"]
+    return result
+
+
+def resolve(query):
+    """
+    Returns (person_id, None) for a name or IMDB id, or (None, error)
+    if it matches nobody or more than one person.
+    """
+    query = query.strip()
+    if query in degrees.people:
+        return query, None
+    person_ids = degrees.names.get(query.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids)), None
+    elif len(person_ids) > 1:
+        choices = ", ".join(sorted(person_ids))
+        return None, f"'{query}' is ambiguous between ids {choices}"
+    return None, f"'{query}' not found"
+
+
+if __name__ == "__main__":
+    main()
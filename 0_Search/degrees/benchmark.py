@@ -0,0 +1,161 @@
+"""
+Benchmarks degrees loading and search on a synthetic actor/movie graph.
+
+Writes people.csv, movies.csv and stars.csv in the same schema as small/,
+then times load_data, neighbors_for_person and every shortest_path
+strategy over random pairs, e.g.
+
+    python benchmark.py --people 100000 --movies 40000 --distribution zipf
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import random
+import tempfile
+import time
+
+import degrees
+from ingest import peak_memory
+
+STRATEGIES = ("bfs", "bidirectional", "landmark")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark degrees on a synthetic graph."
+    )
+    parser.add_argument("--people", type=int, default=20000)
+    parser.add_argument("--movies", type=int, default=8000)
+    parser.add_argument("--stars", type=int, default=4,
+                        help="mean number of stars per movie")
+    parser.add_argument("--distribution", default="zipf",
+                        choices=["uniform", "zipf"],
+                        help="how often each person is cast")
+    parser.add_argument("--exponent", type=float, default=1.0,
+                        help="zipf exponent of the casting distribution")
+    parser.add_argument("--pairs", type=int, default=200,
+                        help="number of random source-target pairs")
+    parser.add_argument("--landmarks", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--directory",
+                        help="where to write the CSVs (default: temporary)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.directory is None:
+        directory = tempfile.mkdtemp(prefix="degrees-benchmark-")
+    else:
+        directory = args.directory
+        os.makedirs(directory, exist_ok=True)
+    generate(directory, args.people, args.movies, args.stars,
+             args.distribution, args.exponent, rng)
+    print(f"Graph: {args.people} people, {args.movies} movies, "
+          f"{args.distribution} casting, in {directory}")
+
+    # Loading, cold from CSV then warm from the snapshot it writes
+    stats = {}
+    report("load_data (csv)", [timed(
+        degrees.load_data, directory, snapshot=False, stats=stats
+    )])
+    degrees.load_data(directory)
+    report("load_data (snapshot)", [timed(degrees.load_data, directory)])
+    print(f"  {stats['rows_per_second']:.0f} rows/s")
+
+    person_ids = degrees.graph.person_ids
+    sample = [rng.choice(person_ids) for _ in range(args.pairs)]
+    report("neighbors_for_person",
+           [timed(degrees.neighbors_for_person, person_id)
+            for person_id in sample])
+
+    report("build_landmarks", [timed(
+        degrees.build_landmarks, count=args.landmarks
+    )])
+
+    pairs = [(rng.choice(person_ids), rng.choice(person_ids))
+             for _ in range(args.pairs)]
+    connected = sum(degrees.connected(*pair) for pair in pairs)
+    print(f"{connected} of {len(pairs)} pairs are connected")
+    for strategy in STRATEGIES:
+        latencies = []
+        expanded = []
+        for source, target in pairs:
+            stats = {}
+            latencies.append(timed(degrees.shortest_path, source, target,
+                                   strategy, stats))
+            expanded.append(stats["source_expanded"]
+                            + stats["target_expanded"])
+        report(f"shortest_path ({strategy})", latencies)
+        print(f"  expanded: mean {sum(expanded) / len(expanded):.1f}, "
+              f"max {max(expanded)}")
+
+    print(f"Peak memory: {peak_memory() / 2 ** 20:.1f} MiB"
+          if peak_memory() is not None else "Peak memory: unknown")
+
+
+def generate(directory, people, movies, stars, distribution, exponent, rng):
+    """
+    Writes a random star graph to the CSVs in directory. Movie cast
+    sizes are uniform around the mean, and each cast member is drawn
+    uniformly or from a zipf distribution over people.
+    """
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(people):
+            writer.writerow([person, f"Person {person}",
+                             rng.randint(1900, 2010)])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie in range(movies):
+            writer.writerow([movie, f"Movie {movie}",
+                             rng.randint(1920, 2020)])
+
+    if distribution == "zipf":
+        weights = list(itertools.accumulate(
+            1 / (rank ** exponent) for rank in range(1, people + 1)
+        ))
+    else:
+        weights = None
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(movies):
+            size = rng.randint(1, 2 * stars - 1)
+            cast = set(rng.choices(range(people), cum_weights=weights,
+                                   k=size))
+            for person in cast:
+                writer.writerow([person, movie])
+
+
+def timed(function, *args, **kwargs):
+    """
+    Calls function and returns the seconds it took.
+    """
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[round(fraction * (len(ordered) - 1))]
+
+
+def report(name, latencies):
+    if len(latencies) == 1:
+        print(f"{name}: {latencies[0] * 1000:.2f} ms")
+        return
+    print(f"{name}: p50 {percentile(latencies, 0.5) * 1000:.3f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.3f} ms "
+          f"over {len(latencies)} calls")
+
+
+if __name__ == "__main__":
+    main()
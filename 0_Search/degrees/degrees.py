@@ -1,55 +1,63 @@
-import csv
 import sys
+from collections import deque
 
-from util import Node, StackFrontier, QueueFrontier
+from ingest import ingest
+from landmarks import LandmarkIndex
+from snapshot import read_snapshot, write_snapshot
+from util import Node, PriorityFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
+# Maps person_ids to a dictionary of: name, birth
 people = {}
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
+# Maps movie_ids to a dictionary of: title, year
 movies = {}
 
+# Integer-indexed adjacency between people and the movies they starred in
+graph = None
 
-def load_data(directory):
+# Distances from hub people, built on request by build_landmarks
+landmark_index = None
+
+
+def load_data(directory, snapshot=True, min_year=None, max_year=None,
+              min_stars=None, stats=None):
     """
     Load data from CSV files into memory.
+
+    Only movies released between min_year and max_year and with at least
+    min_stars stars are loaded, along with the people who starred in
+    them, when any of those filters is given. If a `stats` dict is
+    given, ingestion row counts, throughput and peak memory are recorded
+    in it.
+
+    Unless `snapshot` is False, a binary snapshot in the directory is
+    used instead when it is current with the CSVs and was loaded with
+    the same filters, and a fresh one is written after parsing them.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    global graph, names, people, movies, landmark_index
+
+    landmark_index = None
+    filters = {
+        "min_year": min_year,
+        "max_year": max_year,
+        "min_stars": min_stars
+    }
+    if snapshot:
+        loaded = read_snapshot(directory, filters)
+        if loaded is not None:
+            graph, people, movies, names = loaded
+            return
+
+    graph, people, movies, names = ingest(directory, stats=stats, **filters)
+
+    if snapshot:
+        try:
+            write_snapshot(directory, graph, people, movies, names, filters)
+        except OSError:
+            pass
 
 
 def main():
@@ -84,54 +92,323 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, strategy="bfs", stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    `strategy` is "bfs" to search outward from the source only,
+    "bidirectional" to grow frontiers from both ends and meet in the
+    middle, or "landmark" for an A* search guided and pruned by the
+    bounds from build_landmarks. If a `stats` dict is given, the number
+    of people expanded from each end is recorded in it.
+
     If no possible path, returns None.
     """
-    s_movie = people.get(source).get("movies")
-    queue = QueueFrontier()
-    movie_list = []
-    actor_list = []
-    node_list = []
-    check = 0
-    answer = []
-
-    actor_list.append(source)
-    for i in s_movie:
-        temp_node = Node(source, None, i)
-        queue.add(temp_node)
-
-    while not queue.empty():
-        temp_node = queue.remove()
-        if temp_node.state == target:
-            check = 1
-            break
-        temp_movies = people.get(temp_node.state).get("movies")
-        for i in temp_movies:
-            if i not in movie_list:
-                movie_list.append(i)
-                temp_actors = movies.get(i).get("stars")
-                for j in temp_actors:
-                    if j not in actor_list:
-                        actor_list.append(j)
-                        new_temp_node = Node(j, temp_node.state, i)
-                        node_list.append(new_temp_node)
-                        queue.add(new_temp_node)
-
-    if check == 1:
-        checking = target
-        while checking != source:
-            for k in node_list:
-                if k.state == checking:
-                    answer.insert(0, [k.action, k.state])
-                    checking = k.parent
-        return answer
+    if stats is None:
+        stats = {}
+    stats["source_expanded"] = 0
+    stats["target_expanded"] = 0
+
+    if source == target:
+        return []
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if graph.components[source] != graph.components[target]:
+        return None
+    if strategy == "bfs":
+        path = breadth_first_search(source, target, stats)
+    elif strategy == "bidirectional":
+        path = bidirectional_search(source, target, stats)
+    elif strategy == "landmark":
+        path = landmark_search(source, target, stats)
+    else:
+        raise ValueError(f"unknown search strategy: {strategy}")
+
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
+def breadth_first_search(source, target, stats):
+    """
+    Searches outward from source, testing for target as each
+    person is discovered.
+    """
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+
+    # Maps each discovered person to the (movie, person) hop that first
+    # reached it; doubles as the explored set
+    parents = {source: None}
+    frontier = deque([source])
+
+    # A movie's stars are all discovered the first time it is expanded
+    explored_movies = set()
+
+    while frontier:
+        person = frontier.popleft()
+        stats["source_expanded"] += 1
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            if movie in explored_movies:
+                continue
+            explored_movies.add(movie)
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                neighbor = movie_stars[j]
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = (movie, person)
+
+                # Goal test on generation saves expanding a whole layer
+                if neighbor == target:
+                    return build_path(parents, target)
+                frontier.append(neighbor)
+
+    return None
+
+
+def bidirectional_search(source, target, stats):
+    """
+    Alternately expands a whole layer from whichever end has the
+    cheaper frontier, until the two searches touch.
+    """
+    forward = Search(source)
+    backward = Search(target)
+
+    while forward.frontier and backward.frontier:
+        if forward.cost <= backward.cost:
+            meeting = forward.expand_layer(backward)
+        else:
+            meeting = backward.expand_layer(forward)
+        if meeting is not None:
+            stats["source_expanded"] = forward.expanded
+            stats["target_expanded"] = backward.expanded
+            _, person, movie, neighbor, side = meeting
+            if side is forward:
+                return (build_path(forward.parents, person)
+                        + [(movie, neighbor)]
+                        + follow_parents(backward.parents, neighbor))
+            return (build_path(forward.parents, neighbor)
+                    + [(movie, person)]
+                    + follow_parents(backward.parents, person))
+
+    stats["source_expanded"] = forward.expanded
+    stats["target_expanded"] = backward.expanded
+    return None
+
+
+def landmark_search(source, target, stats):
+    """
+    Answers from the landmark bounds alone when they meet, and otherwise
+    runs A* with the landmark lower bound as its heuristic, discarding
+    anyone who cannot beat the path through the best landmark.
+    """
+    if landmark_index is None:
+        raise ValueError("landmark search needs build_landmarks first")
+    lower, upper, via = landmark_index.bounds(source, target)
+    if lower is None:
+        return None
+    if lower == upper:
+        return landmark_index.path_via(via, source, target)
+
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
 
+    # Ties on the estimate go to the deeper node, nearer the target
+    frontier = PriorityFrontier()
+    frontier.add(Node(source, None, None), (lower, 0))
+    costs = {source: 0}
+    explored = set()
+
+    while not frontier.empty():
+        node = frontier.remove()
+        person = node.state
+        if person in explored:
+            continue
+        if person == target:
+            return node_path(node)
+        explored.add(person)
+        stats["source_expanded"] += 1
+
+        # No path still to be found through the frontier is shorter than
+        # this person's estimate
+        cost = costs[person] + 1
+        bound = costs[person] + landmark_index.lower_bound(person, target)
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                neighbor = movie_stars[j]
+                if neighbor in costs and costs[neighbor] <= cost:
+                    continue
+                if neighbor == target and cost <= bound:
+                    return node_path(Node(neighbor, node, movie))
+                estimate = cost + landmark_index.lower_bound(neighbor, target)
+                if upper is not None and estimate >= upper:
+                    continue
+                costs[neighbor] = cost
+                frontier.add(Node(neighbor, node, movie), (estimate, -cost))
+
+    # Nothing beats the path through the best landmark
+    if upper is not None:
+        return landmark_index.path_via(via, source, target)
     return None
 
+
+def node_path(node):
+    """
+    Follows Node parents back to the root and returns the
+    (movie, person) pairs in order from it.
+    """
+    path = []
+    while node.parent is not None:
+        path.append((node.action, node.state))
+        node = node.parent
+    path.reverse()
+    return path
+
+
+class Search():
+    """
+    One side of a bidirectional search, grown a layer at a time.
+    """
+
+    def __init__(self, root):
+        self.parents = {root: None}
+        self.depth = {root: 0}
+        self.frontier = [root]
+
+        # Co-stars the frontier will generate when expanded, as an
+        # estimate of the work the next layer costs
+        self.cost = graph.degrees[root]
+        self.explored_movies = set()
+        self.expanded = 0
+
+    def expand_layer(self, other):
+        """
+        Expands every person in the frontier and returns the shortest
+        meeting with `other` as (length, person, movie, neighbor, side),
+        or None if the searches have not met yet.
+        """
+        person_offsets = graph.person_offsets
+        person_movies = graph.person_movies
+        movie_offsets = graph.movie_offsets
+        movie_stars = graph.movie_stars
+
+        degrees = graph.degrees
+
+        best = None
+        layer = []
+        cost = 0
+        for person in self.frontier:
+            self.expanded += 1
+            depth = self.depth[person] + 1
+            for i in range(person_offsets[person],
+                           person_offsets[person + 1]):
+                movie = person_movies[i]
+                if movie in self.explored_movies:
+                    continue
+                self.explored_movies.add(movie)
+                for j in range(movie_offsets[movie],
+                               movie_offsets[movie + 1]):
+                    neighbor = movie_stars[j]
+                    if neighbor in other.depth:
+                        length = depth + other.depth[neighbor]
+                        if best is None or length < best[0]:
+                            best = (length, person, movie, neighbor, self)
+                    if neighbor not in self.parents:
+                        self.parents[neighbor] = (movie, person)
+                        self.depth[neighbor] = depth
+                        layer.append(neighbor)
+                        cost += degrees[neighbor]
+
+        # Finish the layer before stopping: a later meeting in the same
+        # layer may land nearer the other root
+        self.frontier = layer
+        self.cost = cost
+        return best
+
+
+def build_path(parents, target):
+    """
+    Follows the parent map back from target and returns the
+    (movie, person) pairs in order from the source.
+    """
+    path = []
+    person = target
+    while parents[person] is not None:
+        movie, parent = parents[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+    return path
+
+
+def follow_parents(parents, person):
+    """
+    Follows a target-rooted parent map from person and returns the
+    (movie, person) pairs leading on to the target.
+    """
+    path = []
+    while parents[person] is not None:
+        movie, parent = parents[person]
+        path.append((movie, parent))
+        person = parent
+    return path
+
+
+def all_distances(person_id):
+    """
+    Returns (distances, parents, parent_movies) arrays indexed like
+    graph.person_ids, from one breadth-first search out of person_id.
+
+    Each reachable person's parent is the next person on a shortest path
+    back to person_id, and parent_movies holds the movie they share.
+    Unreachable people have -1 in all three arrays.
+    """
+    return graph.single_source(graph.person_index[person_id])
+
+
+def build_landmarks(person_ids=None, count=16):
+    """
+    Precomputes distances from the given landmark people, or from the
+    `count` people with the most movies, for the "landmark" strategy
+    and distance_bounds.
+    """
+    global landmark_index
+
+    if person_ids is None:
+        offsets = graph.person_offsets
+        landmarks = sorted(
+            range(len(graph.person_ids)),
+            key=lambda person: offsets[person + 1] - offsets[person],
+            reverse=True
+        )[:count]
+    else:
+        landmarks = [graph.person_index[person_id]
+                     for person_id in person_ids]
+    landmark_index = LandmarkIndex(graph, landmarks)
+
+
+def distance_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two people from the landmark index, in constant time per landmark.
+    Upper is None if no landmark reaches them, and both are None if they
+    are known not to be connected.
+    """
+    if landmark_index is None:
+        raise ValueError("distance bounds need build_landmarks first")
+    lower, upper, _ = landmark_index.bounds(graph.person_index[source],
+                                            graph.person_index[target])
+    return lower, upper
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -163,13 +440,28 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie in graph.movies_of(graph.person_index[person_id]):
+        movie_id = graph.movie_ids[movie]
+        for person in graph.stars_of(movie):
+            neighbors.add((movie_id, graph.person_ids[person]))
     return neighbors
 
 
+def connected(source, target):
+    """
+    Returns True if any path links the two people.
+    """
+    return (graph.components[graph.person_index[source]]
+            == graph.components[graph.person_index[target]])
+
+
+def costar_count(person_id):
+    """
+    Returns how many distinct people a given person has starred with.
+    """
+    return graph.degrees[graph.person_index[person_id]]
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,189 @@
+from array import array
+from collections import deque
+
+
+class StarGraph():
+    """
+    Bipartite graph of people and the movies they starred in.
+
+    Person and movie IDs are interned to dense integer indices, and the
+    edges are stored twice in compressed sparse row form: the movies of
+    person p are person_movies[person_offsets[p]:person_offsets[p + 1]],
+    and the stars of movie m are likewise found through movie_offsets
+    and movie_stars.
+
+    Each person's connected component label and number of distinct
+    co-stars are precomputed into the components and degrees arrays.
+    """
+
+    def __init__(self, person_ids, movie_ids, person_offsets, person_movies,
+                 movie_offsets, movie_stars, components=None, degrees=None,
+                 person_index=None, movie_index=None):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        if person_index is None:
+            person_index = {
+                person_id: i for i, person_id in enumerate(person_ids)
+            }
+        self.person_index = person_index
+        if movie_index is None:
+            movie_index = {
+                movie_id: i for i, movie_id in enumerate(movie_ids)
+            }
+        self.movie_index = movie_index
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        if components is None:
+            components = self.label_components()
+        self.components = components
+        if degrees is None:
+            degrees = self.count_costars()
+        self.degrees = degrees
+
+    @classmethod
+    def from_edges(cls, person_ids, movie_ids, edge_people, edge_movies):
+        """
+        Builds a graph from parallel arrays of (person, movie) index pairs.
+        """
+        person_offsets, person_movies = compress(
+            len(person_ids), edge_people, edge_movies
+        )
+        movie_offsets, movie_stars = compress(
+            len(movie_ids), edge_movies, edge_people
+        )
+        return cls(person_ids, movie_ids, person_offsets, person_movies,
+                   movie_offsets, movie_stars)
+
+    def movies_of(self, person):
+        """
+        Returns the indices of the movies a person starred in.
+        """
+        offsets = self.person_offsets
+        return self.person_movies[offsets[person]:offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Returns the indices of the people who starred in a movie.
+        """
+        offsets = self.movie_offsets
+        return self.movie_stars[offsets[movie]:offsets[movie + 1]]
+
+    def label_components(self):
+        """
+        Returns an array giving each person the label of their connected
+        component, numbering components from 0 in order of discovery.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        components = array("i", [-1]) * len(self.person_ids)
+        explored_movies = bytearray(len(self.movie_ids))
+        label = 0
+        for root in range(len(self.person_ids)):
+            if components[root] >= 0:
+                continue
+            components[root] = label
+            frontier = [root]
+            while frontier:
+                person = frontier.pop()
+                for i in range(person_offsets[person],
+                               person_offsets[person + 1]):
+                    movie = person_movies[i]
+                    if explored_movies[movie]:
+                        continue
+                    explored_movies[movie] = 1
+                    for j in range(movie_offsets[movie],
+                                   movie_offsets[movie + 1]):
+                        neighbor = movie_stars[j]
+                        if components[neighbor] < 0:
+                            components[neighbor] = label
+                            frontier.append(neighbor)
+            label += 1
+        return components
+
+    def count_costars(self):
+        """
+        Returns an array of how many distinct people each person has
+        starred alongside.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        degrees = array("i", bytes(4 * len(self.person_ids)))
+
+        # Last person each co-star was counted for, to skip repeats
+        counted = array("i", [-1]) * len(self.person_ids)
+        for person in range(len(self.person_ids)):
+            counted[person] = person
+            degree = 0
+            for i in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[i]
+                for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                    neighbor = movie_stars[j]
+                    if counted[neighbor] != person:
+                        counted[neighbor] = person
+                        degree += 1
+            degrees[person] = degree
+        return degrees
+
+    def single_source(self, source):
+        """
+        Runs a breadth-first search over every person reachable from
+        source and returns (distances, parents, parent_movies) arrays
+        indexed by person. Each reached person's parent is the next
+        person on a shortest path back to source, and parent_movies
+        holds the movie they share. Unreached entries are -1.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        distances = array("i", [-1]) * len(self.person_ids)
+        parents = array("i", [-1]) * len(self.person_ids)
+        parent_movies = array("i", [-1]) * len(self.person_ids)
+        explored_movies = bytearray(len(self.movie_ids))
+
+        distances[source] = 0
+        frontier = deque([source])
+        while frontier:
+            person = frontier.popleft()
+            distance = distances[person] + 1
+            for i in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[i]
+                if explored_movies[movie]:
+                    continue
+                explored_movies[movie] = 1
+                for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                    neighbor = movie_stars[j]
+                    if distances[neighbor] < 0:
+                        distances[neighbor] = distance
+                        parents[neighbor] = person
+                        parent_movies[neighbor] = movie
+                        frontier.append(neighbor)
+        return distances, parents, parent_movies
+
+
+def compress(count, sources, targets):
+    """
+    Counting-sorts (source, target) edges by source into CSR offsets and
+    an index array, keeping the input order within each row.
+    """
+    offsets = array("i", bytes(4 * (count + 1)))
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    indices = array("i", bytes(4 * len(sources)))
+    position = offsets[:-1]
+    for source, target in zip(sources, targets):
+        indices[position[source]] = target
+        position[source] += 1
+    return offsets, indices
@@ -0,0 +1,181 @@
+import csv
+import sys
+import time
+from array import array
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from graph import StarGraph
+
+
+def ingest(directory, min_year=None, max_year=None, min_stars=None,
+           stats=None):
+    """
+    Streams the CSVs in directory into a StarGraph and returns
+    (graph, people, movies, names).
+
+    Movies released outside [min_year, max_year], or with fewer than
+    min_stars star rows, are rejected as they are read and never stored.
+    When any filter is given, people who star in no remaining movie are
+    skipped as well. If a `stats` dict is given, row counts, throughput
+    and peak memory are recorded in it.
+    """
+    if stats is None:
+        stats = {}
+    stats["rows"] = 0
+    start = time.perf_counter()
+    filtering = (min_year is not None or max_year is not None
+                 or min_stars is not None)
+
+    # Movies, filtered by year
+    movie_ids = []
+    movie_rows = []
+    movie_index = {}
+    for movie_id, title, year in read_rows(
+        directory, "movies.csv", ("id", "title", "year"), stats
+    ):
+        if min_year is not None or max_year is not None:
+            try:
+                released = int(year)
+            except ValueError:
+                continue
+            if ((min_year is not None and released < min_year)
+                    or (max_year is not None and released > max_year)):
+                continue
+        movie_index[movie_id] = len(movie_ids)
+        movie_ids.append(movie_id)
+        movie_rows.append((title, year))
+
+    # Stars of the remaining movies, with people numbered as first seen
+    candidates = {}
+    edge_people = array("i")
+    edge_movies = array("i")
+    for person_id, movie_id in read_rows(
+        directory, "stars.csv", ("person_id", "movie_id"), stats
+    ):
+        movie = movie_index.get(movie_id)
+        if movie is None:
+            continue
+        person = candidates.get(person_id)
+        if person is None:
+            person = candidates[person_id] = len(candidates)
+        edge_people.append(person)
+        edge_movies.append(movie)
+    del movie_index
+
+    # Drop movies with too few stars, renumbering the rest
+    if min_stars is not None:
+        counts = array("i", bytes(4 * len(movie_ids)))
+        for movie in edge_movies:
+            counts[movie] += 1
+        renumbered = array("i", [-1]) * len(movie_ids)
+        kept_ids = []
+        kept_rows = []
+        for movie, count in enumerate(counts):
+            if count >= min_stars:
+                renumbered[movie] = len(kept_ids)
+                kept_ids.append(movie_ids[movie])
+                kept_rows.append(movie_rows[movie])
+        movie_ids, movie_rows = kept_ids, kept_rows
+        edge_people, edge_movies = keep_edges(
+            edge_people, edge_movies, None, renumbered
+        )
+
+    wanted = bytearray(len(candidates))
+    for person in edge_people:
+        wanted[person] = 1
+
+    # People, keeping only those with a remaining movie when filtering
+    person_ids = []
+    people = {}
+    names = {}
+    renumbered = array("i", [-1]) * len(candidates)
+    for person_id, name, birth in read_rows(
+        directory, "people.csv", ("id", "name", "birth"), stats
+    ):
+        person = candidates.get(person_id)
+        if person is None or not wanted[person]:
+            if filtering:
+                continue
+        elif renumbered[person] < 0:
+            renumbered[person] = len(person_ids)
+        people[person_id] = {
+            "name": name,
+            "birth": birth
+        }
+        person_ids.append(person_id)
+        if name.lower() not in names:
+            names[name.lower()] = {person_id}
+        else:
+            names[name.lower()].add(person_id)
+    del candidates
+
+    # Star rows naming unknown people are dropped here
+    edge_people, edge_movies = keep_edges(
+        edge_people, edge_movies, renumbered, None
+    )
+
+    movies = {}
+    for movie_id, (title, year) in zip(movie_ids, movie_rows):
+        movies[movie_id] = {
+            "title": title,
+            "year": year
+        }
+
+    graph = StarGraph.from_edges(person_ids, movie_ids,
+                                 edge_people, edge_movies)
+
+    elapsed = time.perf_counter() - start
+    stats["people"] = len(person_ids)
+    stats["movies"] = len(movie_ids)
+    stats["stars"] = len(edge_people)
+    stats["seconds"] = elapsed
+    stats["rows_per_second"] = stats["rows"] / elapsed if elapsed else None
+    stats["peak_memory"] = peak_memory()
+    return graph, people, movies, names
+
+
+def read_rows(directory, name, columns, stats):
+    """
+    Yields the given columns of each row of a CSV file as a tuple,
+    counting rows read in stats["rows"].
+    """
+    with open(f"{directory}/{name}", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        positions = [header.index(column) for column in columns]
+        for row in reader:
+            stats["rows"] += 1
+            yield tuple(row[position] for position in positions)
+
+
+def keep_edges(edge_people, edge_movies, people, movies):
+    """
+    Renumbers edges through the optional people and movies maps,
+    dropping any edge that either map sends to -1.
+    """
+    kept_people = array("i")
+    kept_movies = array("i")
+    for person, movie in zip(edge_people, edge_movies):
+        if people is not None:
+            person = people[person]
+        if movies is not None:
+            movie = movies[movie]
+        if person >= 0 and movie >= 0:
+            kept_people.append(person)
+            kept_movies.append(movie)
+    return kept_people, kept_movies
+
+
+def peak_memory():
+    """
+    Returns the peak resident set size of this process in bytes, or
+    None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
@@ -0,0 +1,77 @@
+class LandmarkIndex():
+    """
+    Precomputed distances from a set of landmark people to everybody,
+    giving triangle-inequality (ALT) bounds on the distance between any
+    two people.
+    """
+
+    def __init__(self, graph, landmarks):
+        self.landmarks = list(landmarks)
+
+        # One (distances, parents, parent_movies) triple per landmark
+        self.trees = [graph.single_source(landmark)
+                      for landmark in self.landmarks]
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper, landmark) bounds on the distance from
+        source to target, where upper is the length of the path through
+        landmark, or None for either when no landmark reaches both.
+
+        Returns (None, None, None) if a landmark proves the two people
+        are not connected at all.
+        """
+        lower = 0
+        upper = None
+        via = None
+        for landmark, (distances, _, _) in zip(self.landmarks, self.trees):
+            to_source = distances[source]
+            to_target = distances[target]
+            if to_source < 0 and to_target < 0:
+                continue
+            if to_source < 0 or to_target < 0:
+                return None, None, None
+            lower = max(lower, abs(to_source - to_target))
+            if upper is None or to_source + to_target < upper:
+                upper = to_source + to_target
+                via = landmark
+        return lower, upper, via
+
+    def lower_bound(self, person, target):
+        """
+        Returns a lower bound on the distance from person to target.
+        """
+        lower = 0
+        for distances, _, _ in self.trees:
+            to_person = distances[person]
+            to_target = distances[target]
+            if to_person >= 0 and to_target >= 0:
+                difference = to_person - to_target
+                if difference > lower:
+                    lower = difference
+                elif -difference > lower:
+                    lower = -difference
+        return lower
+
+    def path_via(self, landmark, source, target):
+        """
+        Returns the (movie, person) index pairs of the path from source
+        to target through landmark.
+        """
+        _, parents, parent_movies = self.trees[self.landmarks.index(landmark)]
+
+        # Climb from source up to the landmark
+        path = []
+        person = source
+        while person != landmark:
+            path.append((parent_movies[person], parents[person]))
+            person = parents[person]
+
+        # Then descend from the landmark to target
+        descent = []
+        person = target
+        while person != landmark:
+            descent.append((parent_movies[person], person))
+            person = parents[person]
+        descent.reverse()
+        return path + descent
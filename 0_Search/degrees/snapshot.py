@@ -0,0 +1,313 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from collections.abc import Mapping, Sequence
+
+from graph import StarGraph
+
+MAGIC = b"DEGSNAP1"
+VERSION = 4
+
+# Snapshot file kept next to the CSVs it was built from
+FILENAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+ARRAYS = (
+    "person_offsets", "person_movies", "movie_offsets", "movie_stars",
+    "components", "degrees"
+)
+
+# String columns stored as a blob of UTF-8 and the offsets into it, by
+# what each lists
+STRINGS = (
+    "person_ids", "movie_ids", "person_names", "person_births",
+    "movie_titles", "movie_years"
+)
+
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def source_stamps(directory):
+    """
+    Returns the (mtime_ns, size) of each source CSV, which a snapshot
+    must match to be reused.
+    """
+    stamps = {}
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        stamps[name] = [stat.st_mtime_ns, stat.st_size]
+    return stamps
+
+
+def write_snapshot(directory, graph, people, movies, names, filters):
+    """
+    Serializes a graph and its metadata, loaded with the given ingestion
+    filters, to the directory's snapshot file.
+
+    The file is the magic bytes, a length-prefixed JSON header and then
+    raw arrays, 8-byte aligned so they can be mapped in place: the graph
+    arrays, the string columns, hash tables of the people and movies by
+    ID and the order of people by lowercase name.
+    `names` is not stored, since it can be found from the sorted names.
+    """
+    person_ids = list(graph.person_ids)
+    movie_ids = list(graph.movie_ids)
+    person_names = [people[person_id]["name"] for person_id in person_ids]
+    columns = {
+        "person_ids": person_ids,
+        "movie_ids": movie_ids,
+        "person_names": person_names,
+        "person_births": [people[person_id]["birth"]
+                          for person_id in person_ids],
+        "movie_titles": [movies[movie_id]["title"] for movie_id in movie_ids],
+        "movie_years": [movies[movie_id]["year"] for movie_id in movie_ids]
+    }
+    orders = {
+        "person_slots": hash_slots(person_ids),
+        "movie_slots": hash_slots(movie_ids),
+        "name_order": sort_order([name.lower() for name in person_names])
+    }
+
+    arrays = {name: getattr(graph, name) for name in ARRAYS}
+    for name in STRINGS:
+        arrays[f"{name}_offsets"], arrays[f"{name}_blob"] = pack_strings(
+            columns[name]
+        )
+    arrays.update(orders)
+
+    header = {
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "sources": source_stamps(directory),
+        "filters": filters,
+        "arrays": {}
+    }
+    position = 0
+    for name, values in arrays.items():
+        header["arrays"][name] = [position, len(values), values.typecode]
+        position = align(position + len(values) * values.itemsize)
+
+    encoded = json.dumps(header).encode("utf-8")
+    start = align(len(MAGIC) + 4 + len(encoded))
+
+    path = snapshot_path(directory)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(encoded)))
+        f.write(encoded)
+        for name, values in arrays.items():
+            f.seek(start + header["arrays"][name][0])
+            f.write(bytes(values))
+    os.replace(temporary, path)
+
+
+def read_snapshot(directory, filters):
+    """
+    Maps the directory's snapshot file and returns
+    (graph, people, movies, names), or None if there is no snapshot, it
+    is out of date with the source CSVs or it was loaded with different
+    ingestion filters.
+
+    Nothing is decoded up front: the arrays of the returned graph are
+    memoryviews straight onto the mapped file, and its ID lists, the
+    person and movie indexes and the metadata mappings read strings
+    from it as they are looked up.
+    """
+    try:
+        f = open(snapshot_path(directory), "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        length, = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length).decode("utf-8"))
+        if (header["version"] != VERSION
+                or header["byteorder"] != sys.byteorder
+                or header["sources"] != source_stamps(directory)
+                or header["filters"] != filters):
+            return None
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    start = align(len(MAGIC) + 4 + length)
+    view = memoryview(data)
+    arrays = {}
+    for name, (offset, count, typecode) in header["arrays"].items():
+        offset += start
+        size = count * array(typecode).itemsize
+        arrays[name] = view[offset:offset + size].cast(typecode)
+
+    columns = {
+        name: Strings(arrays[f"{name}_offsets"], arrays[f"{name}_blob"])
+        for name in STRINGS
+    }
+    person_index = Index(columns["person_ids"], arrays["person_slots"])
+    movie_index = Index(columns["movie_ids"], arrays["movie_slots"])
+    graph = StarGraph(columns["person_ids"], columns["movie_ids"],
+                      person_index=person_index, movie_index=movie_index,
+                      **{name: arrays[name] for name in ARRAYS})
+    people = Records(person_index, {"name": columns["person_names"],
+                                    "birth": columns["person_births"]})
+    movies = Records(movie_index, {"title": columns["movie_titles"],
+                                   "year": columns["movie_years"]})
+    names = Names(columns["person_names"], arrays["name_order"],
+                  columns["person_ids"])
+    return graph, people, movies, names
+
+
+class Strings(Sequence):
+    """
+    Read-only list of strings stored as one UTF-8 blob, where string i
+    is blob[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class Index(Mapping):
+    """
+    Maps each of a list of distinct strings to its position in the
+    list, through an open-addressing hash table of positions (-1 for
+    an empty slot) built by hash_slots.
+    """
+
+    def __init__(self, strings, slots):
+        self.strings = strings
+        self.slots = slots
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __iter__(self):
+        return iter(self.strings)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            mask = len(self.slots) - 1
+            slot = zlib.crc32(key.encode("utf-8")) & mask
+            i = self.slots[slot]
+            while i >= 0:
+                if self.strings[i] == key:
+                    return i
+                slot = (slot + 1) & mask
+                i = self.slots[slot]
+        raise KeyError(key)
+
+
+class Names(Mapping):
+    """
+    Maps lowercase names to the set of IDs of the people with that
+    name, by binary search over the people in order of lowercase name.
+    """
+
+    def __init__(self, names, order, ids):
+        self.names = names
+        self.order = order
+        self.ids = ids
+
+    def lowered(self, i):
+        return self.names[i].lower()
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __iter__(self):
+        last = None
+        for i in self.order:
+            name = self.lowered(i)
+            if name != last:
+                yield name
+                last = name
+
+    def __getitem__(self, name):
+        low = bisect.bisect_left(self.order, name, key=self.lowered)
+        high = bisect.bisect_right(self.order, name, lo=low, key=self.lowered)
+        if low == high:
+            raise KeyError(name)
+        return {self.ids[self.order[where]] for where in range(low, high)}
+
+
+class Records(Mapping):
+    """
+    Maps IDs to a dict of their fields, read from string columns at the
+    position an Index gives for each ID.
+    """
+
+    def __init__(self, index, fields):
+        self.index = index
+        self.fields = fields
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __getitem__(self, key):
+        i = self.index[key]
+        return {name: column[i] for name, column in self.fields.items()}
+
+
+def pack_strings(strings):
+    """
+    Returns the (offsets, blob) arrays a Strings reads the strings from.
+    """
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = array("q", [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    return offsets, array("B", b"".join(encoded))
+
+
+def hash_slots(strings):
+    """
+    Returns the hash table an Index looks strings up in: a power of two
+    at least twice the number of strings of slots, each holding -1 or
+    the position of a string, placed by CRC-32 with linear probing.
+    CRC-32 is used rather than hash() since it does not change between
+    runs.
+    """
+    size = 1
+    while size < 2 * len(strings):
+        size *= 2
+    slots = array("i", [-1]) * size
+    for i, string in enumerate(strings):
+        slot = zlib.crc32(string.encode("utf-8")) & (size - 1)
+        while slots[slot] >= 0:
+            slot = (slot + 1) & (size - 1)
+        slots[slot] = i
+    return slots
+
+
+def sort_order(keys):
+    """
+    Returns the positions of keys in sorted order, stable among equal
+    keys.
+    """
+    return array("i", sorted(range(len(keys)), key=keys.__getitem__))
+
+
+def align(position):
+    return (position + 7) & ~7
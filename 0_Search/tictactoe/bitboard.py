@@ -0,0 +1,441 @@
+"""
+Bitboard Tic Tac Toe
+"""
+
+import math
+import time
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Win value; heuristic scores of unfinished positions lie strictly
+# between -WIN and WIN
+WIN = 1
+
+# Score of each open line by how many marks one player has in it
+LINE_WEIGHT = 4
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Maps (rows, cols, k) to the Geometry of that board
+geometries = {}
+
+
+class Timeout(Exception):
+    """
+    Raised inside a search when its deadline passes.
+    """
+
+
+class Geometry():
+    """
+    Precomputed masks for a board of rows x cols cells on which k marks
+    in a row win. Cell (i, j) is bit cols * i + j of a mask.
+    """
+
+    def __init__(self, rows, cols, k):
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = rows * cols
+        self.full = (1 << self.cells) - 1
+
+        # Every run of k cells in a row, column or diagonal
+        self.lines = []
+        for i in range(rows):
+            for j in range(cols):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i = i + di * (k - 1)
+                    end_j = j + dj * (k - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < cols:
+                        self.lines.append([(i + di * step, j + dj * step)
+                                           for step in range(k)])
+        self.win_masks = [sum(1 << (cols * i + j) for i, j in line)
+                          for line in self.lines]
+        self.lines_through = [
+            [mask for mask in self.win_masks if mask >> cell & 1]
+            for cell in range(self.cells)
+        ]
+        self.cell_lines = [
+            [line for line, mask in zip(self.lines, self.win_masks)
+             if mask >> cell & 1]
+            for cell in range(self.cells)
+        ]
+
+        # Cells on the most lines first: for 3x3 the center, then
+        # corners, then edges
+        self.move_order = sorted(
+            range(self.cells),
+            key=lambda cell: (-len(self.lines_through[cell]), cell)
+        )
+
+        self.symmetries = self.find_symmetries()
+        self.inverses = [[symmetry.index(cell) for cell in range(self.cells)]
+                         for symmetry in self.symmetries]
+
+        # For each symmetry, the image of every byte of a mask at each
+        # byte offset, so a mask is transformed a byte at a time
+        self.transforms = [
+            [[sum(1 << symmetry[8 * chunk + bit] for bit in range(8)
+                  if value >> bit & 1 and 8 * chunk + bit < self.cells)
+              for value in range(256)]
+             for chunk in range((self.cells + 7) // 8)]
+            for symmetry in self.symmetries
+        ]
+
+        # Maps (x, o) masks to the (value, bound, cell, depth) that
+        # negamax found for them, with value from the point of view of
+        # the player to move and depth the plies searched below them.
+        # With symmetry, positions are stored once per equivalence
+        # class, under the class's smallest masks and with cell in that
+        # orientation.
+        self.table = {}
+
+    def find_symmetries(self):
+        """
+        Returns the rotations and reflections that map the board onto
+        itself, 8 for a square board and 4 otherwise, each as a list
+        giving the cell that every cell maps to.
+        """
+        rows, cols = self.rows, self.cols
+        result = []
+        for turns in (range(4) if rows == cols else (0, 2)):
+            for mirror in (False, True):
+                symmetry = []
+                for cell in range(self.cells):
+                    i, j = divmod(cell, cols)
+                    if turns == 1:
+                        i, j = j, rows - 1 - i
+                    elif turns == 2:
+                        i, j = rows - 1 - i, cols - 1 - j
+                    elif turns == 3:
+                        i, j = cols - 1 - j, i
+                    if mirror:
+                        j = cols - 1 - j
+                    symmetry.append(cols * i + j)
+                result.append(symmetry)
+        return result
+
+    def transform(self, mask, index):
+        """
+        Returns the image of mask under the symmetry at index.
+        """
+        image = 0
+        for chunk in self.transforms[index]:
+            image |= chunk[mask & 0xFF]
+            mask >>= 8
+        return image
+
+    def canonical(self, x, o):
+        """
+        Returns the smallest (x, o) masks among the symmetric versions
+        of a position, and the index of the symmetry that produces them.
+        """
+        best = None
+        for index in range(len(self.symmetries)):
+            key = self.transform(x, index), self.transform(o, index)
+            if best is None or key < best:
+                best = key
+                best_index = index
+        return best, best_index
+
+    def evaluate(self, x, o):
+        """
+        Returns a heuristic score for an unfinished position from X's
+        point of view, strictly between -WIN and WIN. Each line still
+        open to only one player counts for them, more the fuller it is.
+        """
+        score = 0
+        for line in self.win_masks:
+            if not o & line:
+                if x & line:
+                    score += LINE_WEIGHT ** bin(x & line).count("1")
+            elif not x & line:
+                score -= LINE_WEIGHT ** bin(o & line).count("1")
+        return WIN * score / (abs(score) + LINE_WEIGHT ** self.k)
+
+
+def geometry(rows=3, cols=3, k=3):
+    """
+    Returns the shared Geometry for a board shape and win length.
+    """
+    shape = rows, cols, k
+    if shape not in geometries:
+        geometries[shape] = Geometry(rows, cols, k)
+    return geometries[shape]
+
+
+class Bitboard():
+    """
+    Board stored as one mask of cells per player, with the number of
+    moves played kept alongside.
+    """
+    __slots__ = ("x", "o", "moves", "geometry")
+
+    def __init__(self, geometry, x=0, o=0):
+        self.geometry = geometry
+        self.x = x
+        self.o = o
+        self.moves = bin(x).count("1") + bin(o).count("1")
+
+    @classmethod
+    def from_board(cls, board, k=None):
+        """
+        Returns the bitboard for a list-of-lists board, on which k marks
+        in a row win (by default as many as fit in both directions).
+        """
+        rows, cols = len(board), len(board[0])
+        if k is None:
+            k = min(rows, cols)
+        x = o = 0
+        for i in range(rows):
+            for j in range(cols):
+                if board[i][j] == X:
+                    x |= 1 << (cols * i + j)
+                elif board[i][j] == O:
+                    o |= 1 << (cols * i + j)
+        return cls(geometry(rows, cols, k), x, o)
+
+    def to_board(self):
+        """
+        Returns the list-of-lists board for this bitboard.
+        """
+        rows, cols = self.geometry.rows, self.geometry.cols
+        board = [[EMPTY] * cols for _ in range(rows)]
+        for cell in range(self.geometry.cells):
+            if self.x >> cell & 1:
+                board[cell // cols][cell % cols] = X
+            elif self.o >> cell & 1:
+                board[cell // cols][cell % cols] = O
+        return board
+
+    def action(self, cell):
+        """
+        Returns the (i, j) action for cell.
+        """
+        return divmod(cell, self.geometry.cols)
+
+    def player(self):
+        """
+        Returns player who has the next turn.
+        """
+        return O if self.moves & 1 else X
+
+    def empty(self):
+        """
+        Returns the mask of empty cells.
+        """
+        return self.geometry.full & ~(self.x | self.o)
+
+    def make(self, cell):
+        """
+        Plays the player to move on cell.
+        """
+        if self.moves & 1:
+            self.o |= 1 << cell
+        else:
+            self.x |= 1 << cell
+        self.moves += 1
+
+    def unmake(self, cell):
+        """
+        Takes back the last move, which was played on cell.
+        """
+        self.moves -= 1
+        if self.moves & 1:
+            self.o &= ~(1 << cell)
+        else:
+            self.x &= ~(1 << cell)
+
+    def completes_line(self, cell):
+        """
+        Returns True if the last move, played on cell, won the game.
+        """
+        mask = self.x if self.moves & 1 else self.o
+        return any((mask & line) == line
+                   for line in self.geometry.lines_through[cell])
+
+    def winner(self):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        for line in self.geometry.win_masks:
+            if (self.x & line) == line:
+                return X
+            if (self.o & line) == line:
+                return O
+        return None
+
+    def terminal(self):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return (self.winner() is not None
+                or self.moves == self.geometry.cells)
+
+
+def best_move(bitboard, stats, symmetry=True):
+    """
+    Returns the optimal cell for the player to move on a non-terminal
+    bitboard, counting nodes visited in stats["nodes"].
+    """
+    _, cell = root_search(bitboard, stats, symmetry)
+    return cell
+
+
+def deepening_move(bitboard, stats, time_limit, symmetry=True):
+    """
+    Returns the best cell for the player to move on a non-terminal
+    bitboard found by iterative-deepening alpha-beta within time_limit
+    seconds, scoring unfinished leaves heuristically.
+
+    Always completes the one-ply search, and stops early once a search
+    proves a win or a loss or reaches the end of the game. Records the
+    deepest completed depth in stats["depth"].
+    """
+    deadline = time.perf_counter() + time_limit
+    remaining = bitboard.geometry.cells - bitboard.moves
+    best_cell = None
+    for depth in range(1, remaining + 1):
+        try:
+            value, cell = root_search(
+                bitboard, stats, symmetry, depth,
+                None if best_cell is None else deadline
+            )
+        except Timeout:
+            break
+        best_cell = cell
+        stats["depth"] = depth
+        if abs(value) == WIN:
+            break
+    return best_cell
+
+
+def root_search(bitboard, stats, symmetry=True, depth=None, deadline=None):
+    """
+    Returns (value, cell) for the player to move on a non-terminal
+    bitboard, as negamax does with a full window, except that root
+    moves are always tried in the geometry's move order, whatever the
+    table suggests. Of equally good moves, the earliest in move order
+    is chosen, however much of the table earlier searches have filled.
+    """
+    geometry = bitboard.geometry
+    if depth is None:
+        depth = geometry.cells - bitboard.moves
+    if deadline is not None and time.perf_counter() > deadline:
+        raise Timeout
+
+    best_value = -math.inf
+    best_cell = None
+    empty = bitboard.empty()
+    for cell in geometry.move_order:
+        if not empty >> cell & 1:
+            continue
+        value = play(bitboard, cell, best_value, math.inf, stats, symmetry,
+                     depth, deadline)
+        if value > best_value:
+            best_value, best_cell = value, cell
+            if value == WIN:
+                break
+    return best_value, best_cell
+
+
+def play(bitboard, cell, alpha, beta, stats, symmetry, depth, deadline):
+    """
+    Returns the value of playing cell for the player to move, searching
+    `depth` plies in all (the move included) within the window alpha
+    to beta, and leaves the bitboard as it was.
+    """
+    geometry = bitboard.geometry
+    stats["nodes"] += 1
+    bitboard.make(cell)
+    try:
+        if bitboard.completes_line(cell):
+            return WIN
+        elif bitboard.moves == geometry.cells:
+            return 0
+        elif depth <= 1:
+            value = geometry.evaluate(bitboard.x, bitboard.o)
+            return -value if bitboard.player() == X else value
+        return -negamax(bitboard, -beta, -alpha, stats, symmetry,
+                        depth - 1, deadline)[0]
+    finally:
+        bitboard.unmake(cell)
+
+
+def negamax(bitboard, alpha, beta, stats, symmetry=True, depth=None,
+            deadline=None):
+    """
+    Returns (value, cell) for the player to move on a non-terminal
+    bitboard, with value WIN for a win and -WIN for a loss from their
+    point of view. Value is exact if it lies strictly between alpha and
+    beta and is otherwise only a bound.
+
+    Positions `depth` plies down are scored heuristically rather than
+    searched further; by default the search runs to the end of the
+    game. Raises Timeout if the clock passes `deadline`, leaving the
+    bitboard as it was.
+
+    With `symmetry`, rotations and reflections of a position share one
+    table entry, and its cell is mapped back to this board's orientation.
+    """
+    geometry = bitboard.geometry
+    if depth is None:
+        depth = geometry.cells - bitboard.moves
+    if deadline is not None and time.perf_counter() > deadline:
+        raise Timeout
+
+    if symmetry:
+        key, index = geometry.canonical(bitboard.x, bitboard.o)
+        to_key = geometry.symmetries[index]
+        from_key = geometry.inverses[index]
+    else:
+        key = bitboard.x, bitboard.o
+    hint = None
+    if key in geometry.table:
+        value, bound, cell, searched = geometry.table[key]
+        if symmetry:
+            cell = from_key[cell]
+        if searched >= depth and (
+            bound == EXACT
+            or (bound == LOWER and value >= beta)
+            or (bound == UPPER and value <= alpha)
+        ):
+            return value, cell
+        hint = cell
+
+    window = alpha, beta
+    best_value = -math.inf
+    best_cell = None
+    empty = bitboard.empty()
+    order = geometry.move_order
+    if hint is not None:
+        order = [hint] + order
+
+    for cell in order:
+        if not empty >> cell & 1:
+            continue
+        empty &= ~(1 << cell)
+        value = play(bitboard, cell, alpha, beta, stats, symmetry, depth,
+                     deadline)
+
+        if value > best_value:
+            best_value, best_cell = value, cell
+        alpha = max(alpha, value)
+        if alpha >= beta:
+            break
+
+    if best_value <= window[0]:
+        bound = UPPER
+    elif best_value >= window[1]:
+        bound = LOWER
+    else:
+        bound = EXACT
+    if symmetry:
+        geometry.table[key] = best_value, bound, to_key[best_cell], depth
+    else:
+        geometry.table[key] = best_value, bound, best_cell, depth
+    return best_value, best_cell
@@ -0,0 +1,116 @@
+"""
+Perfect-play opening book for Tic Tac Toe.
+
+Run this file to enumerate and solve every position reachable from the
+empty board and write the book to book.bin, which minimax then answers
+from without searching.
+"""
+
+import math
+import os
+
+import bitboard
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# One byte per board, indexed by the board read as a base-3 number with
+# cell (i, j) as digit 3 * i + j, EMPTY as 0, X as 1 and O as 2. Solved
+# positions store best cell << 2 | (value + 1), with value 1 if X wins
+# and -1 if O wins; terminal and unreachable boards store UNSOLVED.
+SIZE = 3 ** 9
+UNSOLVED = 0xFF
+
+# Book bytes once loaded, or None if the book has not been read yet
+entries = None
+
+
+def generate(symmetry=True):
+    """
+    Returns the book as bytes, solving every reachable position, or
+    with `symmetry` one position of each set of rotations and
+    reflections.
+    """
+    book = bytearray([UNSOLVED]) * SIZE
+    solve(bitboard.Bitboard(bitboard.geometry(3, 3, 3)), 0, book, set(),
+          symmetry)
+    return bytes(book)
+
+
+def solve(position, index, book, seen, symmetry):
+    """
+    Stores the best move and value for position and every non-terminal
+    position reachable from it.
+    """
+    if index in seen:
+        return
+    seen.add(index)
+
+    value, cell = bitboard.negamax(position, -math.inf, math.inf,
+                                   {"nodes": 0}, symmetry)
+    if position.player() == bitboard.O:
+        value = -value
+    book[index] = cell << 2 | (value + 1)
+
+    digit = 2 if position.player() == bitboard.O else 1
+    empty = position.empty()
+    for cell in range(9):
+        if not empty >> cell & 1:
+            continue
+        position.make(cell)
+        if not position.completes_line(cell) and position.moves < 9:
+            solve(position, index + digit * 3 ** cell, book, seen,
+                  symmetry)
+        position.unmake(cell)
+
+
+def load(path=PATH):
+    """
+    Reads the book into memory, returning False if there is none.
+    """
+    global entries
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return False
+    if len(data) != SIZE:
+        return False
+    entries = data
+    return True
+
+
+def lookup(board):
+    """
+    Returns (action, value) for a 3x3 board with three in a row to win
+    from the book, or None if the book is missing or does not cover the
+    board.
+    """
+    if entries is None and not load():
+        return None
+    index = 0
+    for i in reversed(range(3)):
+        for j in reversed(range(3)):
+            cell = board[i][j]
+            index = index * 3 + (0 if cell is None
+                                 else 1 if cell == bitboard.X else 2)
+    entry = entries[index]
+    if entry == UNSOLVED:
+        return None
+    cell = entry >> 2
+    return (cell // 3, cell % 3), (entry & 3) - 1
+
+
+if __name__ == "__main__":
+    table = bitboard.geometry(3, 3, 3).table
+    generate(symmetry=False)
+    unreduced = len(table)
+    table.clear()
+    data = generate()
+    reduced = len(table)
+
+    with open(PATH, "wb") as f:
+        f.write(data)
+    solved = sum(entry != UNSOLVED for entry in data)
+    print(f"Wrote {solved} solved positions to {PATH}")
+    print(f"Searched {reduced} symmetry classes instead of {unreduced} "
+          f"positions ({1 - reduced / unreduced:.0%} fewer)")
@@ -0,0 +1,90 @@
+"""
+Background move search for the Tic Tac Toe runner.
+"""
+
+import concurrent.futures
+
+import tictactoe as ttt
+
+
+class Engine():
+    """
+    Runs minimax on a worker thread so the game loop keeps drawing and
+    handling events while the computer thinks.
+
+    While the human is to move, the engine can ponder: it searches the
+    computer's reply to each move the human might make, so the reply to
+    the move actually played is often ready at once.
+    """
+
+    def __init__(self, mode="book", ponder=True):
+        self.mode = mode
+        self.pondering = ponder
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+        # Maps encoded boards to the future of the computer's move there
+        self.searches = {}
+        self.pondered = None
+
+    def move(self, board):
+        """
+        Returns the computer's move on the board if it has been found,
+        or None while it is still being searched, starting the search
+        if needed.
+        """
+        key = ttt.encode(board)
+        # Pondered replies to moves the human did not make would
+        # otherwise run ahead of this search
+        self.discard(keep=key)
+        if key not in self.searches:
+            self.searches[key] = self.executor.submit(
+                ttt.minimax, board, self.mode
+            )
+        future = self.searches[key]
+        if not future.done():
+            return None
+        return future.result()
+
+    def ponder(self, board):
+        """
+        Queues searches for the computer's reply to each move the human
+        can make on the board, cells on the most lines first. Calling
+        it again for the same board does nothing.
+        """
+        key = ttt.encode(board)
+        if not self.pondering or key == self.pondered:
+            return
+        self.pondered = key
+        self.discard()
+        for action in ttt.ordered_actions(board):
+            reply = ttt.result(board, action)
+            if not ttt.terminal(reply):
+                reply_key = ttt.encode(reply)
+                if reply_key not in self.searches:
+                    self.searches[reply_key] = self.executor.submit(
+                        ttt.minimax, reply, self.mode
+                    )
+
+    def discard(self, keep=None):
+        """
+        Forgets every search except the one for the encoded board
+        `keep`, cancelling those not yet started. A search already
+        running finishes in the background.
+        """
+        for key, future in list(self.searches.items()):
+            if key != keep:
+                future.cancel()
+                del self.searches[key]
+
+    def reset(self):
+        """
+        Forgets all searches, for a new game.
+        """
+        self.discard()
+        self.pondered = None
+
+    def shutdown(self):
+        """
+        Stops the worker thread once any running search finishes.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,317 @@
+"""
+Parallel root-split search for Tic Tac Toe.
+
+Each move at the root is searched in its own task on a process pool.
+Workers share the values of finished root moves through shared memory,
+so a move searched after a good one only has to prove whether it does
+better, e.g.
+
+    python parallel.py --rows 4 --cols 4 --k 4 --depth 7 --workers 4
+"""
+
+import argparse
+import concurrent.futures
+import math
+import multiprocessing
+import os
+import time
+
+import bitboard
+import tictactoe as ttt
+
+# Most root moves a search can split, which bounds the board size
+MAX_MOVES = 256
+
+# Shared array of root move values for the search in progress, NaN until
+# a move's exact value is known, and the worker pool that reads it
+values = None
+executor = None
+workers_started = None
+
+# Search whose positions this worker's transposition tables hold
+current_search = None
+searches = 0
+
+
+def pool(workers=None):
+    """
+    Returns the shared process pool with the given number of workers,
+    starting it if needed. By default the pool already running is kept,
+    or one is started with a worker per CPU.
+    """
+    global executor, values, workers_started
+    if workers is None:
+        if executor is not None:
+            return executor
+        workers = os.cpu_count() or 1
+    if executor is not None and workers_started == workers:
+        return executor
+    if executor is not None:
+        executor.shutdown()
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    values = context.Array("d", MAX_MOVES)
+    workers_started = workers
+    executor = concurrent.futures.ProcessPoolExecutor(
+        workers, mp_context=context, initializer=init_worker,
+        initargs=(values,)
+    )
+    return executor
+
+
+def init_worker(shared):
+    global values, current_search
+    values = shared
+    current_search = None
+
+
+def parallel_move(position, stats, depth=None, workers=None, symmetry=True):
+    """
+    Returns the same cell as bitboard.root_search to `depth` plies (by
+    default to the end of the game, so the same as best_move) would for
+    the player to move on a non-terminal bitboard, searching root moves
+    in parallel. Nodes visited by all workers are counted in
+    stats["nodes"].
+    """
+    global searches
+    searches += 1
+    _, cell = split(position, stats, depth, workers, symmetry, searches)
+    return cell
+
+
+def deepening_move(position, stats, time_limit, workers=None,
+                   symmetry=True):
+    """
+    Returns the best cell for the player to move on a non-terminal
+    bitboard found by iterative deepening within time_limit seconds,
+    like bitboard.deepening_move but with every depth split across the
+    process pool. Records the deepest completed depth in stats["depth"].
+    """
+    global searches
+    searches += 1
+    deadline = time.perf_counter() + time_limit
+    remaining = position.geometry.cells - position.moves
+    best_cell = None
+    for depth in range(1, remaining + 1):
+        try:
+            value, cell = split(position, stats, depth, workers, symmetry,
+                                searches,
+                                None if best_cell is None else deadline)
+        except bitboard.Timeout:
+            break
+        best_cell = cell
+        stats["depth"] = depth
+        if abs(value) == bitboard.WIN:
+            break
+    return best_cell
+
+
+def split(position, stats, depth, workers, symmetry, search, deadline=None):
+    """
+    Returns (value, cell) for the player to move on a non-terminal
+    bitboard, searching each root move as a separate task of search
+    number `search`. Raises Timeout if the clock passes `deadline`.
+
+    Root moves are tried in the geometry's move order, and ties go to
+    the earliest, as in bitboard.root_search. With `symmetry`, moves leading to
+    rotations or reflections of an earlier move's position are skipped,
+    since they can only tie with it.
+    """
+    shape = position.geometry
+    if depth is None:
+        depth = shape.cells - position.moves
+    if "nodes" not in stats:
+        stats["nodes"] = 0
+
+    cells = []
+    seen = set()
+    empty = position.empty()
+    for cell in shape.move_order:
+        if not empty >> cell & 1:
+            continue
+        if symmetry:
+            position.make(cell)
+            key, _ = shape.canonical(position.x, position.o)
+            position.unmake(cell)
+            if key in seen:
+                continue
+            seen.add(key)
+        cells.append(cell)
+
+    if len(cells) > MAX_MOVES:
+        raise ValueError(f"too many root moves to split: {len(cells)}")
+    executor = pool(workers)
+    with values.get_lock():
+        for index in range(len(values)):
+            values[index] = math.nan
+
+    futures = [
+        executor.submit(search_root, search, position.x, position.o,
+                        (shape.rows, shape.cols, shape.k), index, cell,
+                        depth, deadline, symmetry)
+        for index, cell in enumerate(cells)
+    ]
+    try:
+        results = [future.result() for future in futures]
+    finally:
+        for future in futures:
+            future.cancel()
+
+    best_value = -math.inf
+    best_cell = None
+    for index, value, exact, nodes in results:
+        stats["nodes"] += nodes
+        if exact and value > best_value:
+            best_value, best_cell = value, cells[index]
+    return best_value, best_cell
+
+
+def search_root(search, x, o, shape, index, cell, depth, deadline,
+                symmetry):
+    """
+    Searches root move number `index`, playing cell, in a worker and
+    returns (index, value, exact, nodes).
+
+    The move only matters if it beats every earlier root move and at
+    least ties every later one, so the values already found for those
+    give the lower end of its search window. If it cannot reach that,
+    the value returned is only an upper bound and exact is False.
+    """
+    global current_search
+    geometry = bitboard.geometry(*shape)
+    if search != current_search:
+        # Entries from another search may have been searched deeper
+        # than this one goes, which would change its values
+        geometry.table.clear()
+        current_search = search
+
+    with values.get_lock():
+        known = values[:]
+    alpha = -math.inf
+    for other, value in enumerate(known):
+        if math.isnan(value) or other == index:
+            continue
+        alpha = max(alpha, value if other < index
+                    else math.nextafter(value, -math.inf))
+
+    stats = {"nodes": 0}
+    position = bitboard.Bitboard(geometry, x, o)
+    value = bitboard.play(position, cell, alpha, math.inf, stats, symmetry,
+                          depth, deadline)
+
+    exact = value > alpha
+    if exact:
+        values[index] = value
+    return index, value, exact, stats["nodes"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark parallel root-split search."
+    )
+    parser.add_argument("--rows", type=int, default=4)
+    parser.add_argument("--cols", type=int, default=4)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=6,
+                        help="plies to search (default 6, 0 to the end)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="largest number of workers to time")
+    parser.add_argument("--positions", type=int, default=3,
+                        help="number of opening positions to search")
+    parser.add_argument("--check", action="store_true",
+                        help="check that the parallel and bitboard modes "
+                             "of minimax agree on every reachable 3x3 "
+                             "position, then exit")
+    args = parser.parse_args()
+
+    if args.check:
+        check(args.workers)
+        return
+
+    geometry = bitboard.geometry(args.rows, args.cols, args.k)
+    depth = args.depth or None
+    positions = openings(geometry, args.positions)
+
+    # Sequential baseline. Searches to the end of the game share the table,
+    # as in minimax, since exact values do not depend on what it holds;
+    # depth-limited values can, so those start from an empty table
+    expected = []
+    start = time.perf_counter()
+    nodes = 0
+    geometry.table.clear()
+    for position in positions:
+        if depth is not None:
+            geometry.table.clear()
+        stats = {"nodes": 0}
+        _, cell = bitboard.root_search(position, stats, True, depth)
+        expected.append(cell)
+        nodes += stats["nodes"]
+    baseline = time.perf_counter() - start
+    print(f"{args.rows}x{args.cols}, {args.k} in a row, depth "
+          f"{args.depth or 'full'}, {len(positions)} positions")
+    print(f"sequential: {baseline:.2f} s, {nodes} nodes")
+
+    for workers in range(1, args.workers + 1):
+        pool(workers)
+        start = time.perf_counter()
+        nodes = 0
+        for position, cell in zip(positions, expected):
+            stats = {"nodes": 0}
+            found = parallel_move(position, stats, depth, workers)
+            if found != cell:
+                raise AssertionError(
+                    f"parallel search chose {found}, sequential {cell}"
+                )
+            nodes += stats["nodes"]
+        elapsed = time.perf_counter() - start
+        print(f"{workers} workers: {elapsed:.2f} s, {nodes} nodes, "
+              f"speedup {baseline / elapsed:.2f}x")
+    executor.shutdown()
+
+
+def check(workers):
+    """
+    Checks that minimax's "parallel" mode plays the same move as its
+    "bitboard" mode on every reachable non-terminal 3x3 position.
+    """
+    # Run as a script, this file is __main__, not the parallel module
+    # minimax uses, so that module's pool is the one to configure
+    ttt.parallel.pool(workers)
+    boards = [ttt.initial_state()]
+    seen = set()
+    checked = 0
+    while boards:
+        board = boards.pop()
+        key = ttt.encode(board)
+        if key in seen or ttt.terminal(board):
+            continue
+        seen.add(key)
+        sequential = ttt.minimax(board, "bitboard")
+        split_move = ttt.minimax(board, "parallel")
+        if split_move != sequential:
+            raise AssertionError(f"parallel mode chose {split_move}, "
+                                 f"bitboard mode {sequential} on {board}")
+        checked += 1
+        boards.extend(ttt.result(board, action)
+                      for action in ttt.actions(board))
+    print(f"parallel and bitboard modes agree on {checked} positions")
+
+
+def openings(geometry, count):
+    """
+    Returns up to count positions: the empty board, then the positions
+    after each of X's first moves in move order.
+    """
+    positions = [bitboard.Bitboard(geometry)]
+    for cell in geometry.move_order[:count - 1]:
+        position = bitboard.Bitboard(geometry)
+        position.make(cell)
+        positions.append(position)
+    return positions[:count]
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,13 @@ import sys
 import time
 
 import tictactoe as ttt
+from engine import Engine
+
+# Optional board size and win length: python runner.py [size [k]]
+if len(sys.argv) > 3:
+    sys.exit("Usage: python runner.py [size [k]]")
+board_size = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+win_length = int(sys.argv[2]) if len(sys.argv) > 2 else board_size
 
 pygame.init()
 size = width, height = 600, 400
@@ -12,19 +19,24 @@ black = (0, 0, 0)
 white = (255, 255, 255)
 
 screen = pygame.display.set_mode(size)
+clock = pygame.time.Clock()
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
 user = None
-board = ttt.initial_state()
+board = ttt.initial_state(board_size, board_size, win_length)
 ai_turn = False
 
+# Searches for the computer on a background thread
+engine = Engine()
+
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            engine.shutdown()
             sys.exit()
 
     screen.fill(black)
@@ -67,13 +79,13 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_size = 240 // board_size
+        tile_origin = (width / 2 - (board_size / 2 * tile_size),
+                       height / 2 - (board_size / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(board_size):
             row = []
-            for j in range(3):
+            for j in range(board_size):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -108,22 +120,27 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move, keeping it on screen for at least half a
+        # second; the search runs in the background meanwhile
         if user != player and not game_over:
             if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
+                move = engine.move(board)
+                if move is not None and time.time() >= ai_shown:
+                    board = ttt.result(board, move)
+                    ai_turn = False
             else:
+                engine.move(board)
                 ai_turn = True
+                ai_shown = time.time() + 0.5
+        elif not game_over:
+            engine.ponder(board)
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(board_size):
+                for j in range(board_size):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -140,7 +157,10 @@ while True:
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
                     user = None
-                    board = ttt.initial_state()
+                    board = ttt.initial_state(board_size, board_size,
+                                              win_length)
                     ai_turn = False
+                    engine.reset()
 
     pygame.display.flip()
+    clock.tick(30)
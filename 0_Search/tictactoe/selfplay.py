@@ -0,0 +1,142 @@
+"""
+Headless self-play between Tic Tac Toe engines.
+
+Plays games between two engines, each a minimax mode or "random", and
+reports results, throughput and per-move latency, e.g.
+
+    python selfplay.py --x alphabeta --o bitboard --games 1000
+
+X's first move is random so that games between deterministic engines
+differ. Games between two perfect engines must end in the value of the
+position after that move, which on 3x3 is always a draw.
+"""
+
+import argparse
+import math
+import random
+import time
+
+import bitboard
+import tictactoe as ttt
+
+# Engines that always play a move of the best value, and those that do
+# only on boards of at most 9 cells, beyond which they search to a
+# time limit
+PERFECT = ("minimax", "cached", "alphabeta", "bitboard")
+SMALL_PERFECT = ("book", "parallel")
+ENGINES = PERFECT + SMALL_PERFECT + ("deepening", "random")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play Tic Tac Toe engines against each other."
+    )
+    parser.add_argument("--x", default="book", choices=ENGINES,
+                        help="engine playing X")
+    parser.add_argument("--o", default="book", choices=ENGINES,
+                        help="engine playing O")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--k", type=int,
+                        help="marks in a row to win (default: size)")
+    parser.add_argument("--time-limit", type=float, default=0.2,
+                        help="seconds per move for deepening searches")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    k = args.size if args.k is None else args.k
+    engines = {ttt.X: args.x, ttt.O: args.o}
+    stats = {player: {"moves": 0, "nodes": 0, "latencies": []}
+             for player in engines}
+    outcomes = {ttt.X: 0, ttt.O: 0, None: 0}
+
+    start = time.perf_counter()
+    for _ in range(args.games):
+        board = ttt.initial_state(args.size, args.size, k)
+        board = ttt.result(board, rng.choice(sorted(ttt.actions(board))))
+        expected = None
+        if perfect(args.x, board) and perfect(args.o, board):
+            expected = value(board)
+        winner = play(board, engines, stats, args.time_limit, rng)
+        if expected is not None and utility(winner) != expected:
+            raise AssertionError(
+                f"perfect play should end in {expected}, "
+                f"but {winner or 'nobody'} won"
+            )
+        outcomes[winner] += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.games} games of {args.x} (X) against {args.o} (O) on "
+          f"{args.size}x{args.size}, {k} in a row")
+    print(f"X wins {outcomes[ttt.X]}, O wins {outcomes[ttt.O]}, "
+          f"draws {outcomes[None]}")
+    print(f"{args.games / elapsed:.1f} games/s")
+    for player, engine in engines.items():
+        report(f"{engine} ({player})", stats[player])
+
+
+def play(board, engines, stats, time_limit, rng):
+    """
+    Plays the game out from board, recording each engine's moves, nodes
+    and latencies in stats, and returns the winner or None for a draw.
+    """
+    while not ttt.terminal(board):
+        player = ttt.player(board)
+        record = stats[player]
+        search = {}
+        begin = time.perf_counter()
+        if engines[player] == "random":
+            action = rng.choice(sorted(ttt.actions(board)))
+            search["nodes"] = 1
+        else:
+            action = ttt.minimax(board, engines[player], search, time_limit)
+        record["latencies"].append(time.perf_counter() - begin)
+        record["moves"] += 1
+        record["nodes"] += search["nodes"]
+        board = ttt.result(board, action)
+    return ttt.winner(board)
+
+
+def perfect(engine, board):
+    """
+    Returns True if engine always plays a move of the best value on
+    boards the size of board.
+    """
+    return engine in PERFECT or (
+        engine in SMALL_PERFECT and len(board) * len(board[0]) <= 9
+    )
+
+
+def value(board):
+    """
+    Returns the value of a non-terminal board under perfect play, 1 if
+    X wins, -1 if O wins and 0 for a draw.
+    """
+    position = bitboard.Bitboard.from_board(board, ttt.win_length(board))
+    result, _ = bitboard.negamax(position, -math.inf, math.inf,
+                                 {"nodes": 0})
+    return result if position.player() == ttt.X else -result
+
+
+def utility(winner):
+    return 1 if winner == ttt.X else -1 if winner == ttt.O else 0
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[round(fraction * (len(ordered) - 1))]
+
+
+def report(name, record):
+    latencies = record["latencies"]
+    seconds = sum(latencies)
+    print(f"{name}: {record['moves']} moves, "
+          f"{record['nodes'] / seconds if seconds else 0:.0f} nodes/s, "
+          f"latency p50 {percentile(latencies, 0.5) * 1000:.3f} ms, "
+          f"p90 {percentile(latencies, 0.9) * 1000:.3f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,40 +3,121 @@ Tic Tac Toe Player
 """
 
 import math
-import copy
+
+import bitboard
+import book
+import parallel
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Maps encoded boards to the (i, j, value) that check_max or check_min
+# found for them, shared by every call to minimax
+transposition_table = {}
+
+# Maps encoded boards to the (value, bound, action) that alphabeta found
+# for them, where bound says whether value is exact or only a bound
+alphabeta_table = {}
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Maps the number of moves played to the last move that caused a cutoff
+killer_moves = {}
+
+
+def frozen(self, *args, **kwargs):
+    raise TypeError("boards can only be changed through result")
 
-def initial_state():
+
+class Row(list):
     """
-    Returns starting state of the board.
+    Row of a Board, a list whose cells cannot be changed in place.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
 
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = frozen
+    append = extend = insert = pop = remove = clear = sort = reverse = frozen
 
-def player(board):
+    def __reduce__(self):
+        return Row, (list(self),)
+
+
+class Board(list):
     """
-    Returns player who has the next turn on a board.
+    List-of-lists board that also records how many marks in a row win
+    (by default as many as fit in both directions) and caches its
+    winner, number of empty cells and player to move.
+
+    The cache is computed once here and then kept up to date by result.
+    Neither the board nor its rows can be changed in place, since that
+    would leave the cache stale, so moves are only made through result.
     """
-    x_num = 0
-    o_num = 0
 
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == "X":
-                x_num += 1
-            elif board[i][j] == "O":
-                o_num += 1
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = frozen
+    append = extend = insert = pop = remove = clear = sort = reverse = frozen
+
+    def __init__(self, rows, k=None):
+        list.__init__(self, [Row(row) for row in rows])
+        if k is None:
+            k = min(len(self), len(self[0]))
+        self.k = k
+        self.geometry = bitboard.geometry(len(self), len(self[0]), k)
+
+        cells = [cell for row in self for cell in row]
+        self.empty = cells.count(EMPTY)
+        self.turn = O if cells.count(X) > cells.count(O) else X
+        self.won = None
+        for line in self.geometry.lines:
+            i, j = line[0]
+            first = self[i][j]
+            if first != EMPTY and all(self[i][j] == first for i, j in line):
+                self.won = first
+                break
+
+    def __reduce__(self):
+        return Board, ([list(row) for row in self], self.k)
+
+
+def initial_state(rows=3, cols=3, k=3):
+    """
+    Returns starting state of a board with rows x cols cells, on which
+    k marks in a row win.
+    """
+    return Board([[EMPTY] * cols for _ in range(rows)], k)
 
-    if x_num > o_num:
-        return "O"
-    else:
-        return "X"
+
+def state(board):
+    """
+    Returns the board as a Board with its cache, wrapping plain lists.
+    """
+    if isinstance(board, Board):
+        return board
+    return Board(board)
+
+
+def win_length(board):
+    """
+    Returns how many marks in a row win on the board. Plain lists win
+    with as many marks as fit in both directions.
+    """
+    return getattr(board, "k", min(len(board), len(board[0])))
+
+
+def geometry(board):
+    """
+    Returns the precomputed lines and masks for the board's shape.
+    """
+    if isinstance(board, Board):
+        return board.geometry
+    return bitboard.geometry(len(board), len(board[0]), win_length(board))
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    return state(board).turn
 
 
 def actions(board):
@@ -45,8 +126,8 @@ def actions(board):
     """
     answer = set()
 
-    for i in range(3):
-        for j in range(3):
+    for i in range(len(board)):
+        for j in range(len(board[i])):
             if board[i][j] == EMPTY:
                 ans = (i, j)
                 answer.add(ans)
@@ -61,10 +142,27 @@ def result(board, action):
     if board[action[0]][action[1]] != EMPTY:
         raise ValueError
 
-    turn = player(board)
-
-    game_board = copy.deepcopy(board)
-    game_board[action[0]][action[1]] = turn
+    board = state(board)
+    i, j = action
+    turn = board.turn
+
+    # Rows cannot change, so only the one with the new mark is copied
+    rows = list(board)
+    rows[i] = Row(board[i][:j] + [turn] + board[i][j + 1:])
+    game_board = Board.__new__(Board)
+    list.__init__(game_board, rows)
+    game_board.k = board.k
+    game_board.geometry = board.geometry
+    game_board.empty = board.empty - 1
+    game_board.turn = O if turn == X else X
+    game_board.won = board.won
+
+    # Only lines through the new mark can have been completed by it
+    if game_board.won is None:
+        for line in board.geometry.cell_lines[board.geometry.cols * i + j]:
+            if all(game_board[i][j] == turn for i, j in line):
+                game_board.won = turn
+                break
 
     return game_board
 
@@ -73,121 +171,249 @@ def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    win = None
-
-    # Check horizontal
-    for i in range(3):
-        if board[i][0] != EMPTY:
-            if board[i][0] == board[i][1] == board[i][2]:
-                win = board[i][0]
-
-    # Check vertical
-    if win is None:
-        for j in range(3):
-            if board[0][j] != EMPTY:
-                if board[0][j] == board[1][j] == board[2][j]:
-                    win = board[0][j]
-
-    # Check diagonal
-    if win is None:
-        if board[0][0] != EMPTY:
-            if board[0][0] == board[1][1] == board[2][2]:
-                win = board[0][0]
-    if win is None:
-        if board[0][2] != EMPTY:
-            if board[0][2] == board[1][1] == board[2][0]:
-                win = board[0][2]
-
-    return win
+    return state(board).won
 
 
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) is not None:
-        return True
-
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == EMPTY:
-                return False
-
-    return True
+    board = state(board)
+    return board.won is not None or board.empty == 0
 
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if winner(board) == "X":
+    won = state(board).won
+    if won == X:
         return 1
-    elif winner(board) == "O":
+    elif won == O:
         return -1
     else:
         return 0
 
 
-def minimax(board):
+def minimax(board, mode="book", stats=None, time_limit=0.2):
     """
     Returns the optimal action for the current player on the board.
+
+    `mode` picks the search: "minimax" for plain minimax, "cached" for
+    minimax with a shared transposition table, "alphabeta" for
+    alpha-beta pruning with move ordering, "bitboard" for alpha-beta
+    on a bitboard copy of the board, "deepening" for the best move that
+    iterative-deepening alpha-beta finds within time_limit seconds,
+    "parallel" to split the "bitboard" search (or, on boards of more
+    than 9 cells, the "deepening" one) across a pool of processes by
+    root move, or "book" to look the move up in the precomputed 3x3
+    opening book.
+    Boards the book does not cover are searched as "bitboard" if they
+    have at most 9 cells and as "deepening" otherwise. If a `stats`
+    dict is given, the number of nodes visited is recorded in it.
     """
+    if stats is None:
+        stats = {}
+    stats["nodes"] = 1
+
+    board = state(board)
     if terminal(board):
         return None
 
+    shape = geometry(board)
+    if mode == "book":
+        if (shape.rows, shape.cols, shape.k) == (3, 3, 3):
+            entry = book.lookup(board)
+            if entry is not None:
+                return entry[0]
+        mode = "bitboard" if shape.cells <= 9 else "deepening"
+
+    if mode == "bitboard":
+        position = bitboard.Bitboard.from_board(board, shape.k)
+        return position.action(bitboard.best_move(position, stats))
+    elif mode == "parallel":
+        position = bitboard.Bitboard.from_board(board, shape.k)
+        if shape.cells <= 9:
+            cell = parallel.parallel_move(position, stats)
+        else:
+            cell = parallel.deepening_move(position, stats, time_limit)
+        return position.action(cell)
+    elif mode == "deepening":
+        position = bitboard.Bitboard.from_board(board, shape.k)
+        return position.action(
+            bitboard.deepening_move(position, stats, time_limit)
+        )
+    elif mode == "alphabeta":
+        _, action = alphabeta(board, -math.inf, math.inf, stats)
+        return action
+    elif mode == "cached":
+        table = transposition_table
+    elif mode == "minimax":
+        table = None
+    else:
+        raise ValueError(f"unknown search mode: {mode}")
+
     ai = player(board)
 
     answer = ()
 
     if ai == "X":
-        answer = check_max(board)
+        answer = check_max(board, table, stats)
     elif ai == "O":
-        answer = check_min(board)
+        answer = check_min(board, table, stats)
 
     return answer[0], answer[1]
 
 
-def check_min(board):
+def alphabeta(board, alpha, beta, stats):
+    """
+    Returns (value, action) for the player to move on the board, where
+    value is exact if it lies strictly between alpha and beta and is
+    otherwise only a bound on the true value.
+
+    Moves are tried transposition table move first, then this depth's
+    killer move, then cells on the most lines first (for 3x3 the
+    center, then corners, then edges).
+    """
+    if terminal(board):
+        return utility(board), None
+
+    key = encode(board)
+    hint = None
+    if key in alphabeta_table:
+        value, bound, action = alphabeta_table[key]
+        if (bound == EXACT
+                or (bound == LOWER and value >= beta)
+                or (bound == UPPER and value <= alpha)):
+            return value, action
+        hint = action
+
+    window = alpha, beta
+    depth = sum(cell is not EMPTY for cell in key[3:])
+    maximizing = player(board) == X
+    best_value = -math.inf if maximizing else math.inf
+    best_action = None
+
+    for action in ordered_actions(board, hint, killer_moves.get(depth)):
+        stats["nodes"] += 1
+        value, _ = alphabeta(result(board, action), alpha, beta, stats)
+        if maximizing:
+            if value > best_value:
+                best_value, best_action = value, action
+            alpha = max(alpha, value)
+        else:
+            if value < best_value:
+                best_value, best_action = value, action
+            beta = min(beta, value)
+        if alpha >= beta:
+            killer_moves[depth] = action
+            break
+
+    if best_value <= window[0]:
+        bound = UPPER
+    elif best_value >= window[1]:
+        bound = LOWER
+    else:
+        bound = EXACT
+    alphabeta_table[key] = best_value, bound, best_action
+    return best_value, best_action
+
+
+def ordered_actions(board, *first):
+    """
+    Returns the available actions in search order: any of the `first`
+    moves that are available, then cells on the most lines first.
+    """
+    available = actions(board)
+    shape = geometry(board)
+    order = tuple(divmod(cell, shape.cols) for cell in shape.move_order)
+    ordered = []
+    for action in first + order:
+        if action in available and action not in ordered:
+            ordered.append(action)
+    return ordered
+
+
+def encode(board):
+    """
+    Returns a hashable key identifying the position on the board, the
+    board's shape and how many in a row win on it.
+    """
+    return ((len(board), len(board[0]), win_length(board))
+            + tuple(cell for row in board for cell in row))
+
+
+def check_min(board, table=None, stats=None):
+    """
+    Returns (i, j, value) for O's best move on the board, reusing and
+    filling the transposition table if one is given. If a `stats` dict
+    is given, each position generated is counted in stats["nodes"].
+    """
+    if table is not None:
+        key = encode(board)
+        if key in table:
+            return table[key]
+
     min_answer = 2
     min_action = ()
 
     action_set = actions(board)
     for i in action_set:
         new_board = result(board, i)
+        if stats is not None:
+            stats["nodes"] += 1
         if terminal(new_board):
             answer = utility(new_board)
             if answer < min_answer:
                 min_answer = answer
                 min_action = i
         else:
-            checking = check_max(new_board)
+            checking = check_max(new_board, table, stats)
             if checking[2] < min_answer:
                 min_answer = checking[2]
                 min_action = i
         if min_answer == -1:
             break
 
-    return min_action[0], min_action[1], min_answer
+    answer = min_action[0], min_action[1], min_answer
+    if table is not None:
+        table[key] = answer
+    return answer
 
 
-def check_max(board):
+def check_max(board, table=None, stats=None):
+    """
+    Returns (i, j, value) for X's best move on the board, reusing and
+    filling the transposition table if one is given. If a `stats` dict
+    is given, each position generated is counted in stats["nodes"].
+    """
+    if table is not None:
+        key = encode(board)
+        if key in table:
+            return table[key]
+
     max_answer = -2
     max_action = ()
 
     action_set = actions(board)
     for i in action_set:
         new_board = result(board, i)
+        if stats is not None:
+            stats["nodes"] += 1
         if terminal(new_board):
             answer = utility(new_board)
             if answer > max_answer:
                 max_answer = answer
                 max_action = i
         else:
-            checking = check_min(new_board)
+            checking = check_min(new_board, table, stats)
             if checking[2] > max_answer:
                 max_answer = checking[2]
                 max_action = i
         if max_answer == 1:
             break
 
-    return max_action[0], max_action[1], max_answer
+    answer = max_action[0], max_action[1], max_answer
+    if table is not None:
+        table[key] = answer
+    return answer
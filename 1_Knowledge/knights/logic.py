@@ -1,19 +1,85 @@
 import itertools
+import weakref
+
+import sat
+
+# Knowledge bases and queries with more symbols than this are checked
+# with the SAT solver rather than by evaluating every model
+SAT_THRESHOLD = 20
+
+# Every live interned sentence, keyed by its class and the name or the
+# identities of its parts, so that building the same sentence twice
+# returns the same object. And is never interned, since add changes it.
+sentences = weakref.WeakValueDictionary()
 
 
 class Sentence():
+    # Sentences with no And inside them never change, so they cache
+    # their hash and symbols; _mutable marks the others
+    __slots__ = ("_hash", "_symbols", "_mutable", "__weakref__")
+
+    @classmethod
+    def interned(cls, key):
+        """Returns (sentence, new): the interned sentence for key, or a
+        new empty one registered under it that the caller must fill in."""
+        sentence = sentences.get(key)
+        if sentence is not None:
+            return sentence, False
+        sentence = object.__new__(cls)
+        sentence._hash = None
+        sentence._symbols = None
+        sentence._mutable = False
+        sentences[key] = sentence
+        return sentence, True
+
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """Evaluates the logical sentence in a model that may leave some
+        symbols unassigned, returning None if its value depends on them."""
+        raise Exception("nothing to evaluate")
+
+    def occurrences(self, counts):
+        """Adds the number of times each symbol occurs in the sentence to
+        the counts dict."""
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        return frozenset()
+
+    def encode(self, cnf):
+        """Adds clauses defining the sentence to cnf, returning a literal
+        equivalent to it."""
+        raise Exception("nothing to encode")
+
+    def source(self, index):
+        """Returns a Python expression for the sentence over a sequence m
+        of truth values, where index maps each symbol to its position."""
+        raise Exception("nothing to compile")
+
+    def compiled(self, symbols):
+        """Returns a function that evaluates the sentence on a sequence of
+        truth values, one for each symbol in `symbols`, in order."""
+        symbols = list(symbols)
+        index = {name: position for position, name in enumerate(symbols)}
+        try:
+            return eval(f"lambda m: {self.source(index)}")
+        except (SyntaxError, RecursionError, MemoryError):
+            # Too deeply nested for Python's parser, so walk the tree
+            return lambda m: self.evaluate(dict(zip(symbols, m)))
+
+    def bitset(self, columns, full):
+        """Returns the truth table of the sentence as an integer whose bit
+        m is set if the sentence holds in model m, given the table of
+        each symbol in `columns` and the table `full` of all models."""
+        raise Exception("nothing to evaluate")
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +109,26 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        self, new = cls.interned((cls, name))
+        if new:
+            self.name = name
+            self._hash = hash(("symbol", name))
+            self._symbols = frozenset([name])
+        return self
 
-    def __init__(self, name):
-        self.name = name
+    def __reduce__(self):
+        return (Symbol, (self.name,))
 
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or (
+            isinstance(other, Symbol) and self.name == other.name
+        )
 
     def __hash__(self):
-        return hash(("symbol", self.name))
+        return self._hash
 
     def __repr__(self):
         return self.name
@@ -62,23 +139,62 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
+    def occurrences(self, counts):
+        counts[self.name] = counts.get(self.name, 0) + 1
+
     def formula(self):
         return self.name
 
     def symbols(self):
-        return {self.name}
+        return self._symbols
+
+    def encode(self, cnf):
+        return cnf.variable(self.name)
+
+    def source(self, index):
+        try:
+            return f"m[{index[self.name]}]"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def bitset(self, columns, full):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        self, new = cls.interned((cls, id(operand)))
+        if new:
+            self.operand = operand
+            self._mutable = operand._mutable
+        return self
+
+    def __reduce__(self):
+        return (Not, (self.operand,))
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (
+            isinstance(other, Not) and hash(self) == hash(other)
+            and self.operand == other.operand
+        )
 
     def __hash__(self):
-        return hash(("not", hash(self.operand)))
+        if self._hash is not None:
+            return self._hash
+        result = hash(("not", hash(self.operand)))
+        if not self._mutable:
+            self._hash = result
+        return result
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,21 +202,54 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
+    def occurrences(self, counts):
+        self.operand.occurrences(counts)
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
     def symbols(self):
-        return self.operand.symbols()
+        if self._symbols is not None:
+            return self._symbols
+        symbols = self.operand.symbols()
+        if not self._mutable:
+            self._symbols = symbols
+        return symbols
+
+    def encode(self, cnf):
+        return -cnf.literal(self.operand)
+
+    def source(self, index):
+        return f"(not {self.operand.source(index)})"
+
+    def bitset(self, columns, full):
+        return full ^ self.operand.bitset(columns, full)
 
 
 class And(Sentence):
+    """Conjunction. Unlike the other sentences it can grow with add, so
+    it is never interned and recomputes its hash and symbols each time."""
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self._hash = None
+        self._symbols = None
+        self._mutable = True
+
+    def __reduce__(self):
+        return (And, tuple(self.conjuncts))
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (
+            isinstance(other, And) and self.conjuncts == other.conjuncts
+        )
 
     def __hash__(self):
         return hash(
@@ -120,6 +269,20 @@ class And(Sentence):
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            elif value is None:
+                result = None
+        return result
+
+    def occurrences(self, counts):
+        for conjunct in self.conjuncts:
+            conjunct.occurrences(counts)
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
@@ -127,22 +290,60 @@ class And(Sentence):
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return frozenset().union(
+            *[conjunct.symbols() for conjunct in self.conjuncts]
+        )
+
+    def encode(self, cnf):
+        return cnf.conjunction([cnf.literal(conjunct)
+                                for conjunct in self.conjuncts])
+
+    def source(self, index):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            conjunct.source(index) for conjunct in self.conjuncts
+        ) + ")"
+
+    def bitset(self, columns, full):
+        table = full
+        for conjunct in self.conjuncts:
+            table &= conjunct.bitset(columns, full)
+        return table
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        self, new = cls.interned(
+            (cls,) + tuple(id(disjunct) for disjunct in disjuncts)
+        )
+        if new:
+            self.disjuncts = list(disjuncts)
+            self._mutable = any(disjunct._mutable for disjunct in disjuncts)
+        return self
+
+    def __reduce__(self):
+        return (Or, tuple(self.disjuncts))
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (
+            isinstance(other, Or) and hash(self) == hash(other)
+            and self.disjuncts == other.disjuncts
+        )
 
     def __hash__(self):
-        return hash(
+        if self._hash is not None:
+            return self._hash
+        result = hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
+        if not self._mutable:
+            self._hash = result
+        return result
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,6 +352,20 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            elif value is None:
+                result = None
+        return result
+
+    def occurrences(self, counts):
+        for disjunct in self.disjuncts:
+            disjunct.occurrences(counts)
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
@@ -158,23 +373,64 @@ class Or(Sentence):
                             for disjunct in self.disjuncts])
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        if self._symbols is not None:
+            return self._symbols
+        symbols = frozenset().union(
+            *[disjunct.symbols() for disjunct in self.disjuncts]
+        )
+        if not self._mutable:
+            self._symbols = symbols
+        return symbols
+
+    def encode(self, cnf):
+        return cnf.disjunction([cnf.literal(disjunct)
+                                for disjunct in self.disjuncts])
+
+    def source(self, index):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            disjunct.source(index) for disjunct in self.disjuncts
+        ) + ")"
+
+    def bitset(self, columns, full):
+        table = 0
+        for disjunct in self.disjuncts:
+            table |= disjunct.bitset(columns, full)
+        return table
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        self, new = cls.interned((cls, id(antecedent), id(consequent)))
+        if new:
+            self.antecedent = antecedent
+            self.consequent = consequent
+            self._mutable = antecedent._mutable or consequent._mutable
+        return self
+
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (
+            isinstance(other, Implication) and hash(self) == hash(other)
+            and self.antecedent == other.antecedent
+            and self.consequent == other.consequent
+        )
 
     def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        if self._hash is not None:
+            return self._hash
+        result = hash(("implies", hash(self.antecedent),
+                       hash(self.consequent)))
+        if not self._mutable:
+            self._hash = result
+        return result
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +439,78 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
+
+    def occurrences(self, counts):
+        self.antecedent.occurrences(counts)
+        self.consequent.occurrences(counts)
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        if self._symbols is not None:
+            return self._symbols
+        symbols = self.antecedent.symbols() | self.consequent.symbols()
+        if not self._mutable:
+            self._symbols = symbols
+        return symbols
+
+    def encode(self, cnf):
+        return cnf.disjunction([-cnf.literal(self.antecedent),
+                                cnf.literal(self.consequent)])
+
+    def source(self, index):
+        antecedent = self.antecedent.source(index)
+        consequent = self.consequent.source(index)
+        return f"(not {antecedent} or {consequent})"
+
+    def bitset(self, columns, full):
+        return ((full ^ self.antecedent.bitset(columns, full))
+                | self.consequent.bitset(columns, full))
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        self, new = cls.interned((cls, id(left), id(right)))
+        if new:
+            self.left = left
+            self.right = right
+            self._mutable = left._mutable or right._mutable
+        return self
+
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (
+            isinstance(other, Biconditional) and hash(self) == hash(other)
+            and self.left == other.left
+            and self.right == other.right
+        )
 
     def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        if self._hash is not None:
+            return self._hash
+        result = hash(("biconditional", hash(self.left), hash(self.right)))
+        if not self._mutable:
+            self._hash = result
+        return result
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,48 +521,138 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
+    def occurrences(self, counts):
+        self.left.occurrences(counts)
+        self.right.occurrences(counts)
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+        if self._symbols is not None:
+            return self._symbols
+        symbols = self.left.symbols() | self.right.symbols()
+        if not self._mutable:
+            self._symbols = symbols
+        return symbols
+
+    def encode(self, cnf):
+        return cnf.equivalence(cnf.literal(self.left), cnf.literal(self.right))
+
+    def source(self, index):
+        left = self.left.source(index)
+        right = self.right.source(index)
+        return f"(bool({left}) == bool({right}))"
+
+    def bitset(self, columns, full):
+        return full ^ (self.left.bitset(columns, full)
+                       ^ self.right.bitset(columns, full))
+
+
+def model_check(knowledge, query, engine="auto"):
+    """Checks if knowledge base entails query.
+
+    `engine` is "enumerate" to check every model in turn, "prune" to
+    assign symbols one at a time and skip every completion of a partial
+    model that already decides the answer, "bitwise" to evaluate all
+    models at once as truth tables packed into integers, "sat" to ask
+    the SAT solver whether knowledge and not query can both hold, or
+    "auto" to use "bitwise" for at most SAT_THRESHOLD symbols and the
+    solver beyond that.
+    """
 
     def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
+        """Checks if knowledge base entails query in every completion of a
+        partial model, assigning the remaining symbols in order."""
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+        # If knowledge base is false, or query true, entailment holds
+        known = knowledge.evaluate_partial(model)
+        if known is False:
             return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+        asked = query.evaluate_partial(model)
+        if asked is True:
+            return True
+        if known is True and asked is False:
+            return False
+
+        # Otherwise some unassigned symbol must still matter
+        p = symbols[len(model)]
+        model[p] = True
+        entailed = check_all(knowledge, query, symbols, model)
+        if entailed:
+            model[p] = False
+            entailed = check_all(knowledge, query, symbols, model)
+        del model[p]
+        return entailed
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    symbols = knowledge.symbols() | query.symbols()
+
+    if engine == "auto":
+        engine = "sat" if len(symbols) > SAT_THRESHOLD else "bitwise"
+    if engine == "sat":
+        return sat_check(knowledge, query)
+    elif engine == "bitwise":
+        return bitwise_check(knowledge, query, symbols)
+    elif engine == "prune":
+
+        # Assign the symbols that occur most often first
+        counts = {}
+        knowledge.occurrences(counts)
+        query.occurrences(counts)
+        symbols = sorted(symbols, key=lambda name: -counts[name])
+        return check_all(knowledge, query, symbols, dict())
+    elif engine != "enumerate":
+        raise ValueError(f"unknown engine: {engine}")
+
+    # Compile both sentences to functions of a tuple of truth values
+    symbols = list(symbols)
+    knows = knowledge.compiled(symbols)
+    implies = query.compiled(symbols)
+
+    # If knowledge base is true in a model, then query must also be true
+    for model in itertools.product((True, False), repeat=len(symbols)):
+        if knows(model) and not implies(model):
+            return False
+    return True
+
+
+def bitwise_check(knowledge, query, symbols):
+    """Checks if knowledge base entails query by comparing their truth
+    tables over every model of the given symbols."""
+    count = 1 << len(symbols)
+    full = (1 << count) - 1
+
+    # Symbol i is true in the models whose number has bit i set: runs of
+    # 2 ** i false models then 2 ** i true ones, repeated to fill the table
+    columns = {}
+    for i, name in enumerate(symbols):
+        run = 1 << i
+        column = ((1 << run) - 1) << run
+        length = 2 * run
+        while length < count:
+            column |= column << length
+            length *= 2
+        columns[name] = column
+
+    return knowledge.bitset(columns, full) & ~query.bitset(columns, full) == 0
+
+
+def sat_check(knowledge, query):
+    """Checks if knowledge base entails query by showing that knowledge
+    and not query is unsatisfiable."""
+    cnf = sat.CNF()
+    cnf.add(cnf.literal(knowledge))
+    cnf.add(-cnf.literal(query))
+    return not sat.satisfiable(cnf)
@@ -0,0 +1,252 @@
+class CNF():
+    """Clauses over integer variables, built from sentences by Tseitin encoding.
+
+    Literals are nonzero integers: variable v is the literal v and its
+    negation -v. Each symbol name gets one variable, and each compound
+    sentence a fresh variable constrained to be equivalent to it.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.count = 0
+        self.variables = {}
+        self.literals = {}
+
+    def add(self, *literals):
+        """Adds a clause, the disjunction of literals."""
+        self.clauses.append(list(literals))
+
+    def new_variable(self):
+        self.count += 1
+        return self.count
+
+    def variable(self, name):
+        """Returns the variable for a symbol name."""
+        if name not in self.variables:
+            self.variables[name] = self.new_variable()
+        return self.variables[name]
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to sentence, encoding it once."""
+        key = id(sentence)
+        if key not in self.literals:
+            self.literals[key] = (sentence, sentence.encode(self))
+        return self.literals[key][1]
+
+    def conjunction(self, literals):
+        """Returns a new literal equivalent to the conjunction of literals."""
+        v = self.new_variable()
+        for literal in literals:
+            self.add(-v, literal)
+        self.add(v, *[-literal for literal in literals])
+        return v
+
+    def disjunction(self, literals):
+        """Returns a new literal equivalent to the disjunction of literals."""
+        v = self.new_variable()
+        for literal in literals:
+            self.add(v, -literal)
+        self.add(-v, *literals)
+        return v
+
+    def equivalence(self, a, b):
+        """Returns a new literal equivalent to a <=> b."""
+        v = self.new_variable()
+        self.add(-v, -a, b)
+        self.add(-v, a, -b)
+        self.add(v, a, b)
+        self.add(v, -a, -b)
+        return v
+
+
+class Solver():
+    """CDCL SAT solver with two watched literals per clause.
+
+    Conflicts are analyzed to the first unique implication point, and
+    the learned clause is added before backjumping. Decisions pick the
+    unassigned variable most involved in recent conflicts, with the
+    value it last had.
+    """
+
+    def __init__(self, count, clauses):
+        self.count = count
+        self.values = [None] * (count + 1)
+        self.levels = [0] * (count + 1)
+        self.reasons = [None] * (count + 1)
+        self.phases = [False] * (count + 1)
+        self.activity = [0.0] * (count + 1)
+        self.increment = 1.0
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.watches = {literal: [] for v in range(1, count + 1)
+                        for literal in (v, -v)}
+        self.ok = True
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def value(self, literal):
+        """Returns the value of literal, or None if it is unassigned."""
+        value = self.values[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def add_clause(self, literals):
+        clause = []
+        for literal in literals:
+            if -literal in clause:
+                return
+            if literal not in clause:
+                clause.append(literal)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            value = self.value(clause[0])
+            if value is False:
+                self.ok = False
+            elif value is None:
+                self.assign(clause[0], clause)
+        else:
+            self.watches[clause[0]].append(clause)
+            self.watches[clause[1]].append(clause)
+
+    def assign(self, literal, reason):
+        v = abs(literal)
+        self.values[v] = literal > 0
+        self.levels[v] = len(self.limits)
+        self.reasons[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """Assigns literals implied by unit clauses, returning a conflicting
+        clause, or None if there is no conflict."""
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = self.watches[false]
+            self.watches[false] = kept = []
+            for position, clause in enumerate(watching):
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if self.value(first) is True:
+                    kept.append(clause)
+                    continue
+
+                # Watch another literal that is not false, if there is one
+                for index in range(2, len(clause)):
+                    if self.value(clause[index]) is not False:
+                        clause[1], clause[index] = clause[index], clause[1]
+                        self.watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.value(first) is False:
+                        kept.extend(watching[position + 1:])
+                        return clause
+                    self.assign(first, clause)
+        return None
+
+    def analyze(self, conflict):
+        """Returns the learned clause for a conflict, asserting literal
+        first, and the level to backjump to."""
+        level = len(self.limits)
+        learned = [None]
+        seen = set()
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for other in (clause if literal is None else clause[1:]):
+                v = abs(other)
+                if v in seen or self.levels[v] == 0:
+                    continue
+                seen.add(v)
+                self.bump(v)
+                if self.levels[v] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+
+            # Resolve on the latest seen literal of this level
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+
+        learned[0] = -literal
+        back = 0
+        for position in range(2, len(learned)):
+            if (self.levels[abs(learned[position])]
+                    > self.levels[abs(learned[1])]):
+                learned[1], learned[position] = learned[position], learned[1]
+        if len(learned) > 1:
+            back = self.levels[abs(learned[1])]
+        return learned, back
+
+    def bump(self, v):
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+
+    def backtrack(self, level):
+        """Undoes every assignment made above the given decision level."""
+        if len(self.limits) <= level:
+            return
+        for literal in self.trail[self.limits[level]:]:
+            v = abs(literal)
+            self.phases[v] = self.values[v]
+            self.values[v] = None
+            self.reasons[v] = None
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Returns the next decision literal, or None if all variables
+        are assigned."""
+        best = None
+        for v in range(1, self.count + 1):
+            if self.values[v] is None and (
+                best is None or self.activity[v] > self.activity[best]
+            ):
+                best = v
+        if best is None:
+            return None
+        return best if self.phases[best] else -best
+
+    def solve(self):
+        """Returns a satisfying assignment as a list of values indexed by
+        variable, or None if the clauses are unsatisfiable."""
+        if not self.ok:
+            return None
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.limits:
+                    return None
+                learned, back = self.analyze(conflict)
+                self.backtrack(back)
+                if len(learned) > 1:
+                    self.watches[learned[0]].append(learned)
+                    self.watches[learned[1]].append(learned)
+                self.assign(learned[0], learned)
+                self.increment /= 0.95
+            else:
+                literal = self.decide()
+                if literal is None:
+                    return self.values[:]
+                self.limits.append(len(self.trail))
+                self.assign(literal, None)
+
+
+def satisfiable(cnf):
+    """Checks if the clauses of cnf can all be satisfied."""
+    return Solver(cnf.count, cnf.clauses).solve() is not None
@@ -0,0 +1,51 @@
+import copy
+import pickle
+
+from logic import *
+
+ENGINES = ("enumerate", "prune", "bitwise", "sat")
+
+A = Symbol("A")
+B = Symbol("B")
+C = Symbol("C")
+
+
+def test_identical_sentences_are_shared():
+    assert Symbol("A") is A
+    assert Or(A, Not(B)) is Or(A, Not(B))
+    assert Biconditional(A, B) is not Biconditional(B, A)
+
+
+def test_add_does_not_change_separately_built_conjunctions():
+    first = And(A, B)
+    second = And(A, B)
+    first.add(C)
+    assert second.conjuncts == [A, B]
+    assert first != second
+
+
+def test_parent_sees_conjunct_added_after_caching():
+    x = And(A)
+    n = Not(x)
+    assert n.symbols() == {"A"}
+    hash(n)
+    x.add(C)
+    assert n.symbols() == {"A", "C"}
+    assert hash(n) == hash(Not(And(A, C)))
+    assert n == Not(And(A, C))
+    for engine in ENGINES:
+        assert model_check(n, Not(A), engine) is False
+
+
+def test_copy_and_pickle_return_interned_sentences():
+    sentence = Implication(Or(A, B), Not(C))
+    assert copy.deepcopy(Symbol("A")) is A
+    assert copy.copy(sentence) is sentence
+    assert pickle.loads(pickle.dumps(Or(A, B))) is Or(A, B)
+    assert pickle.loads(pickle.dumps(sentence)) is sentence
+
+    knowledge = And(sentence, A)
+    restored = pickle.loads(pickle.dumps(knowledge))
+    assert restored is not knowledge
+    assert restored == knowledge
+    assert restored.conjuncts[0] is sentence